@@ -0,0 +1,1043 @@
+import streamlit as st
+from dataclasses import dataclass
+import asyncio
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from settings import get_setting, data_path
+from response_cache import ResponseCache, make_cache_key
+from history_store import HistoryStore
+from session_history import SessionHistory, prune_spill_files
+from projects import ProjectStore, extract_delta
+from usage_rollups import UsageRollups
+from metrics import MetricsRegistry
+from jobs import JobCancelled, JobManager
+from single_flight import SingleFlight, SingleFlightTimeout
+from tokens import count_tokens, split_into_chunks
+from rate_limiter import Outcome, RateLimiter, RateLimitTimeout, backoff_delay, retry_after_seconds
+from routing import DEFAULT_MAX_TOKENS, DEFAULT_TIERS, RoutingPolicy
+from preprocess import PreprocessOptions, preprocess_text
+from hedging import DEFAULT_DEADLINE_SECONDS, Deadline, DeadlineExceeded, Hedger
+
+# openai and the NumPy-backed modules are imported where first used, so the login page
+# and freshly started worker processes do not wait for them
+
+SYSTEM_PROMPTS = {
+    "risk_detection": """You are a transformation management expert specializing in risk detection. 
+    Analyze the provided information for early warning signs of resistance, delays, or issues. 
+    Identify patterns that might indicate problems 2-3 weeks ahead. Provide specific, actionable insights.""",
+
+    "change_guidance": """You are a change management consultant providing practical guidance. 
+    Based on the situation described, provide contextually relevant best practices from proven frameworks 
+    like ADKAR, Kotter's 8-Step Process, or Prosci methodology. Be specific and actionable.""",
+
+    "team_analysis": """You are analyzing team communications and sentiment. 
+    Identify resistance patterns, engagement levels, and collaboration issues. 
+    Highlight both positive indicators and areas of concern.""",
+
+    "recommendations": """You are providing strategic recommendations for transformation success. 
+    Based on the current situation, suggest targeted interventions, timeline adjustments, 
+    and stakeholder management strategies."""
+}
+
+# History labels shown in the UI for each analysis type
+ANALYSIS_TYPE_LABELS = {
+    "risk_detection": "Risk Detection",
+    "change_guidance": "Change Guidance",
+    "team_analysis": "Team Analysis",
+    "recommendations": "Recommendations"
+}
+
+FRAMEWORKS = ["Auto-select", "ADKAR", "Kotter's 8-Step", "Prosci", "McKinsey 7-S"]
+URGENCY_LEVELS = ["Low", "Medium", "High", "Critical"]
+# Urgency levels whose requests jump the rate limiter queue
+PRIORITY_URGENCIES = ("High", "Critical")
+
+# Appended to the system prompt when analysing one chunk of a long input
+MAP_INSTRUCTIONS = """
+
+You are reading section {index} of {total} of a longer text. Analyze only this section;
+your findings will be merged with those from the other sections."""
+
+# Appended to the system prompt when merging per-chunk findings
+REDUCE_INSTRUCTIONS = """
+
+You are given findings produced from consecutive sections of one long text.
+Merge them into a single coherent analysis: combine duplicates, keep specific evidence,
+and call out patterns that span several sections."""
+
+# Appended to the reduce prompt for merges whose output will be merged again
+CONDENSE_INSTRUCTIONS = """
+Keep the merged findings under {words} words; they will be merged again with others."""
+
+# System prompt for maintaining a project's rolling summary
+PROJECT_SUMMARY_PROMPT = """You maintain a running summary of a transformation project's status log.
+Merge the new log entries into the existing summary. Keep dates, owners, open risks, slipped
+milestones and resistance signals; drop detail that no longer matters. Reply with the updated
+summary only, in at most {words} words."""
+
+def compose_input(user_input, analysis_type, framework=None, urgency=None):
+    """Attach the framework or urgency selection to the user input the way each tab does"""
+    if analysis_type == "change_guidance" and framework and framework != "Auto-select":
+        return f"{user_input}\n\nPreferred framework: {framework}"
+    if analysis_type == "recommendations" and urgency:
+        return f"{user_input}\n\nUrgency level: {urgency}"
+    return user_input
+
+def http2_available():
+    """Check whether the optional h2 package is installed so httpx can negotiate HTTP/2"""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def _http_client_options():
+    from openai import DEFAULT_CONNECTION_LIMITS, Timeout
+
+    # Pool limits must be built with the HTTP library the installed SDK is built on
+    limits_class = type(DEFAULT_CONNECTION_LIMITS)
+    return {
+        "http2": http2_available(),
+        "limits": limits_class(
+            max_connections=get_setting("OPENAI_POOL_SIZE", 20),
+            max_keepalive_connections=get_setting("OPENAI_POOL_KEEPALIVE", 10),
+            keepalive_expiry=get_setting("OPENAI_KEEPALIVE_SECONDS", 60.0)
+        ),
+        "timeout": Timeout(
+            get_setting("OPENAI_TIMEOUT_SECONDS", 120.0),
+            connect=get_setting("OPENAI_CONNECT_TIMEOUT_SECONDS", 10.0)
+        )
+    }
+
+@st.cache_resource(show_spinner=False)
+def get_shared_openai_client(api_key):
+    """Build one pooled OpenAI client per API key, shared by all sessions and reruns"""
+    from openai import DefaultHttpxClient, OpenAI
+
+    return OpenAI(
+        api_key=api_key,
+        base_url=get_setting("OPENAI_BASE_URL", "") or None,
+        http_client=DefaultHttpxClient(**_http_client_options()),
+        max_retries=get_setting("OPENAI_MAX_RETRIES", 0)
+    )
+
+def create_async_openai_client(api_key):
+    """Build a pooled async OpenAI client; it is bound to the event loop it is first used in"""
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+    return AsyncOpenAI(
+        api_key=api_key,
+        base_url=get_setting("OPENAI_BASE_URL", "") or None,
+        http_client=DefaultAsyncHttpxClient(**_http_client_options()),
+        max_retries=get_setting("OPENAI_MAX_RETRIES", 0)
+    )
+
+@st.cache_resource(show_spinner=False)
+def start_client_warm_up(api_key):
+    """Import the OpenAI SDK and build the shared client on a background thread, once per process and key"""
+    thread = threading.Thread(target=get_shared_openai_client, args=(api_key,), name="openai-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+def get_openai_client():
+    """Get the shared OpenAI client instance"""
+    if st.session_state.openai_api_key:
+        try:
+            return get_shared_openai_client(st.session_state.openai_api_key)
+        except Exception as e:
+            st.error(f"Error initializing OpenAI client: {str(e)}")
+            return None
+    return None
+
+def check_openai_connection():
+    """Verify connectivity and credentials with a models listing, which costs no completion tokens"""
+    client = get_openai_client()
+    if not client:
+        return False, "No API key configured"
+    started = time.perf_counter()
+    try:
+        client.models.list()
+    except Exception as e:
+        return False, format_api_error(e)
+    return True, f"Reachable in {(time.perf_counter() - started) * 1000:.0f} ms"
+
+@st.cache_resource
+def get_response_cache():
+    """Get the response cache shared by all sessions in this process"""
+    return ResponseCache(
+        data_path("response_cache.sqlite3"),
+        ttl_seconds=get_setting("RESPONSE_CACHE_TTL_SECONDS", 7 * 24 * 3600),
+        max_memory_entries=get_setting("RESPONSE_CACHE_MEMORY_ENTRIES", 256),
+        max_disk_entries=get_setting("RESPONSE_CACHE_DISK_ENTRIES", 10000)
+    )
+
+@st.cache_resource
+def get_semantic_cache():
+    """Get the near-duplicate answer cache shared by all sessions, or None when it is disabled"""
+    if not get_setting("SEMANTIC_CACHE_ENABLED", False):
+        return None
+    from semantic_cache import DEFAULT_THRESHOLDS, HashingEmbedder, OpenAIEmbedder, SemanticCache
+
+    api_key = get_setting("OPENAI_API_KEY", "")
+    if get_setting("SEMANTIC_CACHE_EMBEDDER", "hashing") == "openai" and api_key:
+        embedder = OpenAIEmbedder(get_shared_openai_client(api_key))
+    else:
+        embedder = HashingEmbedder()
+    return SemanticCache(
+        embedder,
+        thresholds={
+            analysis_type: get_setting(f"SEMANTIC_CACHE_THRESHOLD_{analysis_type.upper()}", threshold)
+            for analysis_type, threshold in DEFAULT_THRESHOLDS.items()
+        },
+        max_entries=get_setting("SEMANTIC_CACHE_MAX_ENTRIES", 20000),
+        ttl_seconds=get_setting("RESPONSE_CACHE_TTL_SECONDS", 7 * 24 * 3600)
+    )
+
+@st.cache_resource
+def get_history_store():
+    """Get the persistent analysis history store"""
+    return HistoryStore(data_path("history.sqlite3"))
+
+@st.cache_resource
+def get_project_store():
+    """Get the store of tracked projects and their rolling summaries"""
+    return ProjectStore(data_path("projects.sqlite3"))
+
+def create_session_history():
+    """Create an empty per-session history within the configured memory budget"""
+    spill_dir = data_path("session_history")
+    # Spill files outlive sessions whose process crashed; clear out the stale ones
+    prune_spill_files(spill_dir, get_setting("SESSION_SPILL_MAX_AGE_HOURS", 24) * 3600)
+    return SessionHistory(
+        spill_dir,
+        memory_budget=get_setting("SESSION_HISTORY_MEMORY_BYTES", 262144)
+    )
+
+@st.cache_resource
+def get_usage_rollups():
+    """Get the cross-session usage rollups shared by all worker processes"""
+    return UsageRollups(data_path("usage_rollups.sqlite3"))
+
+@st.cache_resource
+def get_analytics_frame(username):
+    """Get the process-wide columnar analytics view of a user's history"""
+    from analytics_frame import AnalyticsFrame
+
+    return AnalyticsFrame()
+
+@st.cache_resource
+def get_metrics():
+    """Get this process's metrics registry, exported as a Prometheus textfile"""
+    metrics_dir = get_setting("METRICS_TEXTFILE_DIR", "") or data_path("metrics")
+    return MetricsRegistry(os.path.join(metrics_dir, f"transformation_assistant_{os.getpid()}.prom"))
+
+@st.cache_resource
+def get_job_manager():
+    """Get the background job pool shared by all sessions in this process"""
+    return JobManager(max_workers=get_setting("JOB_WORKERS", 8))
+
+@st.cache_resource
+def get_single_flight():
+    """Get the coalescer that shares identical in-flight API calls between sessions"""
+    return SingleFlight(abandon_errors=(JobCancelled,))
+
+@st.cache_resource
+def get_routing_policy():
+    """Get the model routing policy, with tiers and budgets overridable per setting"""
+    def optional_seconds(name, default):
+        value = get_setting(name, default)
+        return float(value) if value not in (None, "") else None
+
+    tiers = {}
+    for name, tier in DEFAULT_TIERS.items():
+        prefix = f"ROUTE_{name.upper()}_"
+        tiers[name] = {
+            "model": get_setting(prefix + "MODEL", tier["model"]),
+            "fallback_model": get_setting(prefix + "FALLBACK_MODEL", tier["fallback_model"] or "") or None,
+            "first_token_seconds": optional_seconds(prefix + "FIRST_TOKEN_SECONDS", tier["first_token_seconds"]),
+            "response_seconds": optional_seconds(prefix + "RESPONSE_SECONDS", tier["response_seconds"]),
+        }
+    type_tiers = {}
+    for analysis_type in DEFAULT_MAX_TOKENS:
+        tier = get_setting(f"ROUTE_TIER_{analysis_type.upper()}", "").strip().lower()
+        if tier:
+            type_tiers[analysis_type] = tier
+    return RoutingPolicy(
+        tiers=tiers,
+        max_tokens={
+            analysis_type: get_setting(f"MAX_TOKENS_{analysis_type.upper()}", default)
+            for analysis_type, default in DEFAULT_MAX_TOKENS.items()
+        },
+        short_input_tokens=get_setting("ROUTE_SHORT_INPUT_TOKENS", 250),
+        long_input_tokens=get_setting("ROUTE_LONG_INPUT_TOKENS", 2000),
+        fast_max_tokens=get_setting("ROUTE_FAST_MAX_TOKENS", 500),
+        enabled=get_setting("ROUTING_ENABLED", True),
+        type_tiers=type_tiers
+    )
+
+@st.cache_resource
+def get_hedger():
+    """Get the request hedger shared by all sessions in this process; hedging is off unless HEDGING_ENABLED"""
+    return Hedger(
+        enabled=get_setting("HEDGING_ENABLED", False),
+        percentile=get_setting("HEDGE_PERCENTILE", 95.0),
+        min_samples=get_setting("HEDGE_MIN_SAMPLES", 20),
+        min_delay_seconds=get_setting("HEDGE_MIN_DELAY_SECONDS", 1.0),
+        max_rate=get_setting("HEDGE_MAX_RATE", 0.05)
+    )
+
+def analysis_deadline(analysis_type, rounds=1):
+    """Start the deadline for one analysis of analysis_type, or return None when it has none
+
+    An analysis made of several sequential rounds of calls gets the type's
+    deadline once per round.
+    """
+    seconds = get_setting(
+        f"DEADLINE_SECONDS_{analysis_type.upper()}", DEFAULT_DEADLINE_SECONDS.get(analysis_type, 150.0)
+    )
+    return Deadline(seconds * rounds) if seconds > 0 else None
+
+@st.cache_resource
+def get_preprocess_options():
+    """Get the clean-up stages applied to pasted communications, each switchable per setting"""
+    return PreprocessOptions(
+        strip_quotes=get_setting("PREPROCESS_QUOTES", True),
+        strip_signatures=get_setting("PREPROCESS_SIGNATURES", True),
+        strip_disclaimers=get_setting("PREPROCESS_DISCLAIMERS", True),
+        dedupe=get_setting("PREPROCESS_DEDUPE", True),
+        near_duplicates=get_setting("PREPROCESS_NEAR_DUPLICATES", True),
+        compact_whitespace=get_setting("PREPROCESS_WHITESPACE", True),
+        mask_pii=get_setting("PREPROCESS_MASK_PII", False)
+    )
+
+def preprocess_input(user_input, analysis_type):
+    """Strip noise from pasted communications for the types in PREPROCESS_TYPES, or return None"""
+    types = get_setting("PREPROCESS_TYPES", "risk_detection,team_analysis")
+    if analysis_type not in {name.strip() for name in types.split(",")}:
+        return None
+    return preprocess_text(user_input, get_preprocess_options())
+
+@st.cache_resource
+def get_rate_limiter():
+    """Get the rate limiter shared by all sessions in this process"""
+    return RateLimiter(
+        requests_per_minute=get_setting("RATE_LIMIT_RPM", 500),
+        tokens_per_minute=get_setting("RATE_LIMIT_TPM", 40000),
+        max_concurrency=get_setting("RATE_LIMIT_MAX_CONCURRENCY", 16)
+    )
+
+def format_api_error(error):
+    """Map an OpenAI exception to a user-facing warning"""
+    error_msg = str(error)
+    if isinstance(error, (RateLimitTimeout, SingleFlightTimeout)):
+        return "⚠️ The assistant is busy right now. Please try again in a minute."
+    elif isinstance(error, DeadlineExceeded):
+        return f"⚠️ The analysis did not finish within {error.seconds:g} seconds and was stopped. Please try again."
+    elif "rate_limit" in error_msg.lower():
+        return "⚠️ Rate limit exceeded. Please wait a moment and try again."
+    elif "insufficient_quota" in error_msg.lower():
+        return "⚠️ Insufficient API credits. Please check your OpenAI account balance."
+    elif "invalid_api_key" in error_msg.lower():
+        return "⚠️ Invalid API key. Please check your OpenAI API key in Streamlit secrets."
+    else:
+        return f"⚠️ Error: {error_msg}\n\nPlease check your API key and ensure you have sufficient credits."
+
+def build_request(user_input, analysis_type, system_prompt=None, urgency=None, max_tokens=None):
+    """Build the chat messages, sampling parameters, cache key and model Route for an analysis
+
+    max_tokens, when given, caps the route's output budget.
+    """
+    if system_prompt is None:
+        system_prompt = SYSTEM_PROMPTS.get(analysis_type, SYSTEM_PROMPTS["risk_detection"])
+    route = get_routing_policy().select(analysis_type, count_tokens(user_input), urgency)
+    request_params = {
+        "model": route.model,
+        "temperature": 0.7,
+        "max_tokens": min(route.max_tokens, max_tokens) if max_tokens else route.max_tokens
+    }
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_input}
+    ]
+    return messages, request_params, make_cache_key(system_prompt, user_input, **request_params), route
+
+def semantic_scope(user_input):
+    """The framework or urgency selection appended by compose_input, which near-duplicates must share exactly"""
+    _, _, selection = user_input.rpartition("\n\n")
+    return selection if selection.startswith(("Preferred framework:", "Urgency level:")) else ""
+
+def estimate_request_tokens(messages, request_params):
+    """Token cost of a request for limiter admission: prompt tokens plus the output budget"""
+    prompt_tokens = sum(count_tokens(message["content"], request_params["model"]) for message in messages)
+    return prompt_tokens + request_params.get("max_tokens", 0)
+
+def is_retryable(error):
+    """Whether an API error is transient (429 other than quota exhaustion, 5xx, connection failures)"""
+    from openai import APIConnectionError, InternalServerError, RateLimitError
+
+    if isinstance(error, RateLimitError):
+        return "insufficient_quota" not in str(error).lower()
+    return isinstance(error, (APIConnectionError, InternalServerError))
+
+def fallback_reason(error):
+    """Why a routed request should switch to its fallback model: "timeout", "rate_limited" or None"""
+    from openai import APITimeoutError, RateLimitError
+
+    if isinstance(error, APITimeoutError):
+        return "timeout"
+    if isinstance(error, RateLimitError) and is_retryable(error):
+        return "rate_limited"
+    return None
+
+def _queue_timeout(deadline):
+    """Seconds to wait for a limiter slot, never past deadline; raises DeadlineExceeded once it has passed"""
+    timeout = get_setting("RATE_LIMIT_QUEUE_TIMEOUT_SECONDS", 120.0)
+    if deadline is None:
+        return timeout
+    if deadline.expired:
+        raise DeadlineExceeded(deadline.seconds)
+    return min(timeout, deadline.remaining())
+
+def _retry_delay(attempt, error, deadline):
+    """Backoff before retrying after error, or None when the retry could not start before deadline"""
+    delay = backoff_delay(attempt, retry_after=retry_after_seconds(error))
+    if deadline is not None and delay >= deadline.remaining():
+        return None
+    return delay
+
+def call_with_retries(send, estimated_tokens, priority=False, can_retry=None, deadline=None):
+    """Send a request through the shared rate limiter, retrying transient failures with jittered backoff
+
+    send(outcome) performs the request and may set outcome.tokens_used; can_retry()
+    lets the caller veto a retry, e.g. once streamed tokens have reached the user.
+    With a deadline, neither the wait for a slot nor the backoff runs past it.
+    """
+    from openai import RateLimitError
+
+    limiter = get_rate_limiter()
+    max_attempts = get_setting("RATE_LIMIT_MAX_ATTEMPTS", 4)
+    for attempt in range(max_attempts):
+        try:
+            with limiter.slot(estimated_tokens, priority=priority, timeout=_queue_timeout(deadline)) as outcome:
+                try:
+                    return send(outcome)
+                except RateLimitError as e:
+                    if is_retryable(e):
+                        outcome.rate_limited = True
+                        outcome.retry_after = retry_after_seconds(e)
+                    raise
+        except Exception as e:
+            if attempt + 1 >= max_attempts or not is_retryable(e) or (can_retry and not can_retry()):
+                raise
+            delay = _retry_delay(attempt, e, deadline)
+            if delay is None:
+                raise
+            time.sleep(delay)
+
+async def _acquire_async(limiter, tokens, priority, timeout):
+    """Wait for a limiter slot on a worker thread without leaking it when the caller is cancelled
+
+    The waiting thread cannot be interrupted, so a slot it wins after the caller
+    gave up is released straight away.
+    """
+    acquiring = asyncio.ensure_future(asyncio.to_thread(limiter.acquire, tokens, priority, timeout))
+
+    def release_unused(future):
+        if not future.cancelled() and future.exception() is None:
+            limiter.release(tokens_estimated=tokens, tokens_used=0)
+
+    try:
+        await asyncio.shield(acquiring)
+    except asyncio.CancelledError:
+        acquiring.add_done_callback(release_unused)
+        raise
+
+async def call_with_retries_async(send, estimated_tokens, priority=False, deadline=None):
+    """Async counterpart of call_with_retries for coroutine senders
+
+    With a deadline, the wait for a limiter slot, each request and the backoff
+    are bounded by the time it has left, and DeadlineExceeded is raised once it passes.
+    """
+    from openai import RateLimitError
+
+    limiter = get_rate_limiter()
+    max_attempts = get_setting("RATE_LIMIT_MAX_ATTEMPTS", 4)
+    for attempt in range(max_attempts):
+        await _acquire_async(limiter, estimated_tokens, priority, _queue_timeout(deadline))
+        outcome = Outcome(estimated_tokens)
+        try:
+            if deadline is None:
+                return await send(outcome)
+            try:
+                return await asyncio.wait_for(send(outcome), deadline.remaining())
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded(deadline.seconds) from None
+        except Exception as e:
+            if attempt + 1 >= max_attempts or not is_retryable(e):
+                raise
+            if isinstance(e, RateLimitError):
+                outcome.rate_limited = True
+                outcome.retry_after = retry_after_seconds(e)
+            delay = _retry_delay(attempt, e, deadline)
+            if delay is None:
+                raise
+        finally:
+            limiter.release(
+                rate_limited=outcome.rate_limited,
+                retry_after=outcome.retry_after,
+                tokens_estimated=estimated_tokens,
+                tokens_used=outcome.tokens_used
+            )
+        await asyncio.sleep(delay)
+
+@dataclass
+class AnalysisResult:
+    """Text returned to the user for one analysis plus metadata about the call"""
+    text: str
+    analysis_type: str
+    status: str = "ok"  # "ok", "cached", "error" or "partial" (an answer that misses part of the input)
+    latency_ms: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    ttft_ms: float = None  # only measured for streamed calls
+    model: str = ""
+    error_class: str = ""
+    cache_similarity: float = None  # set when answered by the semantic cache
+    coalesced: bool = False  # True when an identical in-flight request's answer was shared
+    route: str = ""  # routing tier the request was sent to
+    fallback: bool = False  # True when the tier's fallback model answered
+    hedged: bool = False  # True when a duplicate request was sent because the first was slow
+    preprocess: object = None  # PreprocessResult when the input was cleaned before sending
+
+    def metrics(self):
+        """Per-call metrics in the shape HistoryStore.append expects"""
+        return {
+            "latency_ms": self.latency_ms,
+            "ttft_ms": self.ttft_ms,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "model": self.model,
+            "status": self.status,
+            "error_class": self.error_class,
+            "route": self.route + (" (fallback)" if self.fallback else ""),
+        }
+
+def _record_usage(result, outcome, usage, model=None):
+    if model:
+        result.model = model
+    if usage is not None:
+        result.prompt_tokens = usage.prompt_tokens or 0
+        result.completion_tokens = usage.completion_tokens or 0
+        outcome.tokens_used = usage.total_tokens
+
+def perform_analysis(user_input, analysis_type, use_cache=True, on_token=None, urgency=None,
+                     client=None, system_prompt=None, deadline=None, max_tokens=None):
+    """Analyze transformation data using OpenAI and return an AnalysisResult
+
+    When on_token is given the completion is streamed and on_token is called with
+    each text fragment as it arrives; the complete text is still returned.
+    High and Critical urgency requests are admitted ahead of others when the
+    shared rate limiter is saturated. Pass client explicitly when calling from a
+    worker thread, where the session's API key is not available. Calls that make
+    up one larger analysis share its deadline (a Deadline); otherwise one is
+    started for analysis_type. max_tokens caps the routed output budget.
+    """
+    started = time.perf_counter()
+    messages, request_params, cache_key, route = build_request(
+        user_input, analysis_type, system_prompt, urgency, max_tokens
+    )
+    result = AnalysisResult(text="", analysis_type=analysis_type, model=route.model, route=route.name)
+
+    def finish(text, status="ok"):
+        result.text = text
+        result.status = status
+        result.latency_ms = (time.perf_counter() - started) * 1000
+        return result
+
+    # Identical prompts are answered from the shared cache unless bypassed
+    cache = get_response_cache() if use_cache else None
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            if on_token is not None:
+                on_token(cached)
+            return finish(cached, "cached")
+
+    # Near-duplicates of earlier inputs (a changed date or name) reuse their answer
+    semantic = get_semantic_cache() if use_cache and system_prompt is None else None
+    if semantic is not None:
+        scope = semantic_scope(user_input)
+        try:
+            vector = semantic.embed(user_input)
+        except Exception:
+            semantic = None
+        else:
+            answer, similarity = semantic.lookup(analysis_type, vector, scope)
+            if answer is not None:
+                result.cache_similarity = similarity
+                if on_token is not None:
+                    on_token(answer)
+                return finish(answer, "cached")
+
+    client = client or get_openai_client()
+    if not client:
+        return finish("Please configure your OpenAI API key in Streamlit Cloud secrets.", "error")
+
+    streamed = []
+    if deadline is None:
+        deadline = analysis_deadline(analysis_type)
+    hedger = get_hedger()
+
+    def request(outcome, model, timeout):
+        # Slow calls may be hedged with a duplicate; the first to answer wins and the other is stopped
+        params = dict(request_params, model=model)
+        if deadline is not None:
+            if deadline.expired:
+                raise DeadlineExceeded(deadline.seconds)
+            timeout = min(timeout or deadline.remaining(), deadline.remaining())
+        if timeout:
+            params["timeout"] = timeout
+
+        def attempt(claim):
+            if on_token is None:
+                return client.chat.completions.create(messages=messages, **params)
+            stream = client.chat.completions.create(
+                messages=messages, stream=True, stream_options={"include_usage": True}, **params
+            )
+            try:
+                for chunk in stream:
+                    if getattr(chunk, "usage", None) is not None:
+                        _record_usage(result, outcome, chunk.usage, getattr(chunk, "model", None))
+                    if not chunk.choices:
+                        continue
+                    token = chunk.choices[0].delta.content
+                    if token:
+                        claim()
+                        if not streamed:
+                            result.ttft_ms = (time.perf_counter() - started) * 1000
+                        streamed.append(token)
+                        on_token(token)
+            finally:
+                # Closing the connection stops generation if on_token aborted the stream or the race was lost
+                if hasattr(stream, "close"):
+                    stream.close()
+            return "".join(streamed)
+
+        def on_hedge():
+            result.hedged = True
+
+        answer = hedger.run((model, analysis_type, on_token is not None), attempt, deadline, on_hedge)
+        if on_token is not None:
+            return answer
+        _record_usage(result, outcome, answer.usage, getattr(answer, "model", None))
+        return answer.choices[0].message.content
+
+    def send(outcome):
+        # The route's budget bounds the wait for the first token (or the whole answer
+        # when not streaming); a slow or rate-limited primary hands over to the fallback
+        try:
+            return request(outcome, route.model, route.timeout(on_token is not None))
+        except Exception as e:
+            reason = fallback_reason(e) if route.fallback_model and not streamed else None
+            if reason is None:
+                raise
+            if reason == "rate_limited":
+                outcome.rate_limited = True
+                outcome.retry_after = retry_after_seconds(e)
+            result.fallback = True
+            return request(outcome, route.fallback_model, None)
+
+    def call():
+        return call_with_retries(
+            send,
+            estimate_request_tokens(messages, request_params),
+            priority=urgency in PRIORITY_URGENCIES,
+            can_retry=lambda: not streamed,
+            deadline=deadline
+        )
+
+    # Identical requests already in flight (from any session) share one upstream call
+    wait_timeout = get_setting("SINGLE_FLIGHT_TIMEOUT_SECONDS", 300.0)
+    if deadline is not None:
+        wait_timeout = min(wait_timeout, deadline.remaining())
+    try:
+        text, shared = get_single_flight().do(cache_key, call, timeout=wait_timeout)
+    except Exception as e:
+        # Keep whatever already reached the user and append the mapped error
+        result.error_class = type(e).__name__
+        error = format_api_error(e)
+        if streamed:
+            return finish("".join(streamed) + "\n\n" + error, "error")
+        return finish(error, "error")
+
+    if shared:
+        # The leader already cached the answer and accounted for its tokens
+        result.coalesced = True
+        if on_token is not None:
+            on_token(text)
+        return finish(text, "cached")
+    if cache is not None and text:
+        cache.set(cache_key, text)
+    if semantic is not None and text:
+        semantic.add(analysis_type, vector, text, scope)
+    return finish(text)
+
+def analyze_transformation_data(user_input, analysis_type, use_cache=True, on_token=None, urgency=None):
+    """Analyze transformation data using OpenAI
+
+    Pasted communications are cleaned by preprocess_input first. Returns only the
+    analysis text; see perform_analysis for call metadata.
+    """
+    cleaned = preprocess_input(user_input, analysis_type)
+    text = cleaned.text if cleaned else user_input
+    return perform_analysis(text, analysis_type, use_cache, on_token, urgency).text
+
+def _group_by_tokens(texts, budget):
+    """Pack texts into consecutive groups whose combined token count stays within budget"""
+    groups, current, current_tokens = [], [], 0
+    for text in texts:
+        text_tokens = count_tokens(text)
+        if current and current_tokens + text_tokens > budget:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += text_tokens
+    if current:
+        groups.append(current)
+    return groups
+
+def _planned_rounds(chunks, concurrency):
+    """Most sequential rounds of calls a chunked analysis of this many chunks makes"""
+    rounds = math.ceil(chunks / concurrency)
+    groups = chunks
+    while groups > 1:
+        # Every reduce round at least halves the findings
+        rounds += math.ceil(groups / concurrency)
+        groups = math.ceil(groups / 2)
+    return rounds + 1
+
+def perform_chunked_analysis(user_input, analysis_type, use_cache=True, on_token=None, urgency=None,
+                             on_progress=None, client=None):
+    """Analyze input of any length by map-reducing over token-counted chunks
+
+    Inputs within CHUNK_THRESHOLD_TOKENS go straight to perform_analysis. Longer
+    inputs are split into overlapping chunks that are analysed in parallel (map);
+    the partial findings are then merged into one answer (reduce), in several
+    rounds if they do not fit a single request. Intermediate merges are condensed
+    to a quarter of a chunk, and a round whose output still does not pack into
+    fewer requests is merged pairwise, so every round shrinks the findings. Only
+    the final merge is streamed. Sections that failed, failed merges and findings
+    left out because every merge of a round failed are listed under the answer,
+    whose status is then "partial".
+    on_progress(done, total) is called from the calling thread as chunks finish.
+    All calls share one deadline: the type's deadline for each of the sequential
+    rounds (map waves of CHUNK_CONCURRENCY calls, reduce rounds and the final
+    merge) that _planned_rounds allows for.
+    """
+    client = client or get_openai_client()
+    if not client or count_tokens(user_input) <= get_setting("CHUNK_THRESHOLD_TOKENS", 3500):
+        return perform_analysis(user_input, analysis_type, use_cache, on_token, urgency, client)
+
+    started = time.perf_counter()
+    chunk_tokens = get_setting("CHUNK_TOKENS", 3000)
+    chunks = split_into_chunks(user_input, chunk_tokens, get_setting("CHUNK_OVERLAP_TOKENS", 200))
+    base_prompt = SYSTEM_PROMPTS.get(analysis_type, SYSTEM_PROMPTS["risk_detection"])
+    concurrency = max(1, get_setting("CHUNK_CONCURRENCY", 4))
+    deadline = analysis_deadline(analysis_type, _planned_rounds(len(chunks), concurrency))
+    calls = []
+
+    def run_parallel(inputs, system_prompts, max_tokens=None):
+        results = [None] * len(inputs)
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = {
+                executor.submit(
+                    perform_analysis, text, analysis_type, use_cache, None, urgency, client, prompt, deadline,
+                    max_tokens
+                ): index
+                for index, (text, prompt) in enumerate(zip(inputs, system_prompts))
+            }
+            try:
+                for done, future in enumerate(as_completed(futures), start=1):
+                    results[futures[future]] = future.result()
+                    if on_progress is not None:
+                        on_progress(done, len(inputs))
+            except BaseException:
+                # on_progress may abort (e.g. a cancelled job): drop chunks not yet started
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+        calls.extend(results)
+        return results
+
+    total = len(chunks)
+    partials = run_parallel(
+        chunks,
+        [base_prompt + MAP_INSTRUCTIONS.format(index=index, total=total) for index in range(1, total + 1)]
+    )
+    findings = [
+        f"Section {index} findings:\n{partial.text}"
+        for index, partial in enumerate(partials, start=1) if partial.status != "error"
+    ]
+    if not findings:
+        return partials[0]
+
+    # Merge in rounds until the findings fit in one request, streaming only the last one. Intermediate
+    # merges are capped at a quarter of a chunk, so several of them fit in the next round's groups
+    reduce_prompt = base_prompt + REDUCE_INSTRUCTIONS
+    merge_tokens = max(1, chunk_tokens // 4)
+    condense_prompt = reduce_prompt + CONDENSE_INSTRUCTIONS.format(words=merge_tokens * 3 // 4)
+    failed_merges, omitted = 0, 0
+    groups = _group_by_tokens(findings, chunk_tokens)
+    while len(groups) > 1:
+        merged = run_parallel(
+            ["\n\n".join(group) for group in groups], [condense_prompt] * len(groups), merge_tokens
+        )
+        # A failed merge passes its group's findings on unmerged
+        findings, failed_before = [], failed_merges
+        for group, result in zip(groups, merged):
+            if result.status == "error":
+                failed_merges += 1
+                findings.extend(group)
+            else:
+                findings.append(f"Merged findings {len(findings) + 1}:\n{result.text}")
+        regrouped = _group_by_tokens(findings, chunk_tokens)
+        if len(merged) == failed_merges - failed_before:
+            # Every merge failed, so another round would not shrink the findings: merge what fits and say so
+            omitted = sum(len(group) for group in regrouped[1:])
+            regrouped = regrouped[:1]
+        elif len(regrouped) >= len(groups):
+            # Merged findings that are longer than asked for are merged pairwise instead
+            regrouped = [findings[index:index + 2] for index in range(0, len(findings), 2)]
+        groups = regrouped
+    final_started = time.perf_counter()
+    final = perform_analysis(
+        "\n\n".join(groups[0]), analysis_type, use_cache, on_token, urgency, client, reduce_prompt, deadline
+    )
+    calls.append(final)
+
+    failed = sum(1 for partial in partials if partial.status == "error")
+    notes = []
+    if failed:
+        notes.append(f"{failed} of {total} sections could not be analysed and are not reflected above.")
+    if failed_merges:
+        notes.append(f"{failed_merges} intermediate merge(s) failed; their findings were passed on unmerged.")
+    if omitted:
+        notes.append(f"{omitted} set(s) of findings did not fit in the final merge and are not reflected above.")
+    text = "".join([final.text] + [f"\n\n⚠️ {note}" for note in notes])
+    if final.status == "error":
+        status = "error"
+    elif notes:
+        status = "partial"
+    else:
+        status = "cached" if all(call.status == "cached" for call in calls) else "ok"
+    return AnalysisResult(
+        text=text,
+        analysis_type=analysis_type,
+        status=status,
+        latency_ms=(time.perf_counter() - started) * 1000,
+        prompt_tokens=sum(call.prompt_tokens for call in calls),
+        completion_tokens=sum(call.completion_tokens for call in calls),
+        ttft_ms=None if final.ttft_ms is None else (final_started - started) * 1000 + final.ttft_ms,
+        model=final.model,
+        error_class=final.error_class,
+        route=final.route,
+        fallback=any(call.fallback for call in calls),
+        hedged=any(call.hedged for call in calls)
+    )
+
+async def perform_analysis_async(client, user_input, analysis_type, cache=None, urgency=None):
+    """Async counterpart of perform_analysis for an explicit AsyncOpenAI client"""
+    started = time.perf_counter()
+    messages, request_params, cache_key, route = build_request(user_input, analysis_type, urgency=urgency)
+    result = AnalysisResult(text="", analysis_type=analysis_type, model=route.model, route=route.name)
+
+    def finish(text, status="ok"):
+        result.text = text
+        result.status = status
+        result.latency_ms = (time.perf_counter() - started) * 1000
+        return result
+
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return finish(cached, "cached")
+
+    async def request(outcome, model, timeout):
+        params = dict(request_params, model=model)
+        if timeout:
+            params["timeout"] = timeout
+        response = await client.chat.completions.create(messages=messages, **params)
+        _record_usage(result, outcome, response.usage, getattr(response, "model", None))
+        return response.choices[0].message.content
+
+    async def send(outcome):
+        try:
+            return await request(outcome, route.model, route.timeout(False))
+        except Exception as e:
+            reason = fallback_reason(e) if route.fallback_model else None
+            if reason is None:
+                raise
+            if reason == "rate_limited":
+                outcome.rate_limited = True
+                outcome.retry_after = retry_after_seconds(e)
+            result.fallback = True
+            return await request(outcome, route.fallback_model, None)
+
+    try:
+        text = await call_with_retries_async(
+            send,
+            estimate_request_tokens(messages, request_params),
+            priority=urgency in PRIORITY_URGENCIES,
+            deadline=analysis_deadline(analysis_type)
+        )
+    except Exception as e:
+        result.error_class = type(e).__name__
+        return finish(format_api_error(e), "error")
+
+    if cache is not None and text:
+        cache.set(cache_key, text)
+    return finish(text)
+
+async def analyze_batch(api_key, rows, concurrency=4, use_cache=True, on_result=None):
+    """Run many analyses concurrently with at most `concurrency` requests in flight
+
+    rows are dicts with `input`, `analysis_type` and optional `framework`/`urgency`;
+    each input is cleaned by preprocess_input before the selections are appended.
+    on_result(index, result) is called from the event loop as each row completes;
+    AnalysisResults are returned in row order.
+    """
+    cache = get_response_cache() if use_cache else None
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    client = create_async_openai_client(api_key)
+
+    async def run_row(index, row):
+        cleaned = preprocess_input(row["input"], row["analysis_type"])
+        text = cleaned.text if cleaned else row["input"]
+        # As on the tabs, urgency only applies to recommendations (prompt, routing and priority)
+        urgency = row.get("urgency") if row["analysis_type"] == "recommendations" else None
+        user_input = compose_input(text, row["analysis_type"], row.get("framework"), urgency)
+        async with semaphore:
+            result = await perform_analysis_async(client, user_input, row["analysis_type"], cache, urgency=urgency)
+        result.preprocess = cleaned
+        return index, result
+
+    results = [None] * len(rows)
+    try:
+        for finished in asyncio.as_completed([run_row(i, row) for i, row in enumerate(rows)]):
+            index, result = await finished
+            results[index] = result
+            if on_result is not None:
+                on_result(index, result)
+    finally:
+        await client.close()
+    return results
+
+def compose_project_input(summary, delta):
+    """User input for a tracked project: its rolling summary followed by only the new log entries"""
+    if not summary:
+        return delta
+    return f"Project summary so far:\n{summary}\n\nNew log entries since the last update:\n{delta}"
+
+def perform_project_analysis(username, project, log_text, use_cache=True, on_token=None, on_progress=None,
+                             client=None):
+    """Risk analysis of a project's cumulative log that sends only what changed since the last submission
+
+    The new entries are analysed together with the project's stored rolling
+    summary, which is then updated with them in a second, non-streamed call.
+    The project's token counters record the prompt tokens sent (both calls)
+    against what sending the whole log would have cost. The analysis has the
+    deadline of a chunked analysis and the summary call its own.
+    """
+    client = client or get_openai_client()
+    store = get_project_store()
+    state = store.get(username, project) or {"summary": "", "last_log": ""}
+    delta = extract_delta(state["last_log"], log_text)
+    if not delta:
+        return AnalysisResult(
+            text=f"No new log entries for {project} since its last update.",
+            analysis_type="risk_detection",
+            status="cached"
+        )
+
+    user_input = compose_project_input(state["summary"], delta)
+    result = perform_chunked_analysis(user_input, "risk_detection", use_cache, on_token, None, on_progress, client)
+    if result.status == "error":
+        return result
+
+    summary_input = f"Existing summary:\n{state['summary'] or '(none yet)'}\n\nNew log entries:\n{delta}"
+    summary_prompt = PROJECT_SUMMARY_PROMPT.format(words=get_setting("PROJECT_SUMMARY_WORDS", 300))
+    summary = perform_analysis(summary_input, "risk_detection", use_cache, client=client, system_prompt=summary_prompt)
+    if summary.status == "error":
+        # Keep the old log so these entries are sent again with the next submission
+        return result
+    store.record(
+        username, project, summary.text, log_text,
+        full_prompt_tokens=count_tokens(log_text),
+        sent_prompt_tokens=count_tokens(user_input) + count_tokens(summary_input)
+    )
+    return result
+
+def submit_analysis_job(user_input, analysis_type, history_type, history_input, use_cache=True, urgency=None,
+                        project=None):
+    """Queue an analysis on the background job pool and return its Job
+
+    The job streams into job.partial_text, reports chunk progress in job.progress
+    and persists its result as soon as it finishes, even if the session has moved
+    on; record_analysis(..., persist=False) later adds it to the session history.
+    Pasted communications are cleaned by preprocess_input first. With a project
+    name, a risk detection is run through perform_project_analysis.
+    """
+    client = get_openai_client()
+    username = st.session_state.username
+
+    def run(job):
+        cleaned = preprocess_input(user_input, analysis_type)
+        text = cleaned.text if cleaned else user_input
+        if project:
+            result = perform_project_analysis(
+                username, project, text, use_cache, job.on_token, job.on_progress, client
+            )
+        else:
+            result = perform_chunked_analysis(
+                text, analysis_type, use_cache, job.on_token, urgency, job.on_progress, client
+            )
+        result.preprocess = cleaned
+        return result
+
+    def on_done(job):
+        persist_analysis(job.username, job.history_type, job.history_input, job.result, job.finished_at)
+
+    return get_job_manager().submit(
+        run, username, analysis_type, history_type, history_input, on_done=on_done
+    )
+
+def persist_analysis(username, history_type, history_input, result, created_at=None):
+    """Write a completed AnalysisResult to the persistent store, the usage rollups and the metrics export
+
+    Safe to call from worker threads.
+    """
+    created_at = created_at or time.time()
+    get_history_store().append(
+        username, history_type, history_input, result.text, created_at, metrics=result.metrics()
+    )
+    get_usage_rollups().record(
+        username,
+        history_type,
+        status=result.status,
+        latency_ms=result.latency_ms,
+        prompt_tokens=result.prompt_tokens,
+        completion_tokens=result.completion_tokens,
+        at=created_at
+    )
+    metrics = get_metrics()
+    metrics.observe(history_type, result)
+    metrics.write_textfile()
+
+def record_analysis(history_type, history_input, result, created_at=None, persist=True):
+    """Record a completed AnalysisResult in the session history and, unless it already was, persist it"""
+    created_at = created_at or time.time()
+    st.session_state.chat_history.append(history_type, history_input, result.text, created_at)
+    if persist:
+        persist_analysis(st.session_state.username, history_type, history_input, result, created_at)
@@ -0,0 +1,171 @@
+import threading
+import numpy as np
+
+COLUMNS = ("ids", "created_at", "type_codes", "input_lengths", "output_lengths", "latency_ms", "ttft_ms",
+           "prompt_tokens", "completion_tokens", "cached")
+
+class AnalyticsSnapshot:
+    """Read-only view of an AnalyticsFrame's rows at one sync, safe to query while the frame grows.
+
+    Columns are read-only NumPy arrays named as in COLUMNS; categories maps
+    type codes back to type labels.
+    """
+
+    def __init__(self, columns, categories):
+        for name in COLUMNS:
+            column = columns[name]
+            column.flags.writeable = False
+            setattr(self, name, column)
+        self.categories = tuple(categories)
+        self._category_codes = {entry_type: code for code, entry_type in enumerate(self.categories)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def mask(self, types=None, ids=None):
+        """Boolean row mask for the given type labels and/or history ids"""
+        mask = np.ones(len(self), dtype=bool)
+        if types is not None:
+            codes = [self._category_codes[t] for t in types if t in self._category_codes]
+            mask &= np.isin(self.type_codes, codes)
+        if ids is not None:
+            mask &= np.isin(self.ids, np.fromiter(ids, dtype=np.int64))
+        return mask
+
+    def type_counts(self, mask=None):
+        """Return {type: count} for the masked rows"""
+        codes = self.type_codes if mask is None else self.type_codes[mask]
+        counts = np.bincount(codes, minlength=len(self.categories))
+        return {self.categories[code]: int(count) for code, count in enumerate(counts) if count}
+
+    def timeline(self, mask=None, bucket_seconds=60):
+        """Return (bucket_start_epochs, counts) for the masked rows"""
+        created_at = self.created_at if mask is None else self.created_at[mask]
+        return np.unique(created_at - created_at % bucket_seconds, return_counts=True)
+
+    def mean_input_length(self, mask=None):
+        """Average pasted input length in characters for the masked rows"""
+        lengths = self.input_lengths if mask is None else self.input_lengths[mask]
+        return float(lengths.mean()) if len(lengths) else 0.0
+
+    def percentiles(self, column, mask=None, percentiles=(50, 95, 99)):
+        """Return {percentile: value} of a timing column over masked API calls, or {} if none were timed
+
+        Cache hits and entries without a recorded value are excluded.
+        """
+        values = getattr(self, column)
+        keep = ~self.cached & ~np.isnan(values)
+        if mask is not None:
+            keep &= mask
+        if not keep.any():
+            return {}
+        return dict(zip(percentiles, np.percentile(values[keep], percentiles).tolist()))
+
+    def token_histogram(self, column, mask=None, bins=20):
+        """Return (bin_edges, counts) of a token column over masked API calls that reported usage"""
+        values = getattr(self, column)
+        keep = ~self.cached & (values > 0)
+        if mask is not None:
+            keep &= mask
+        counts, edges = np.histogram(values[keep], bins=bins)
+        return edges, counts
+
+class AnalyticsFrame:
+    """Columnar, incrementally maintained view of one user's history for analytics.
+
+    Holds history ids, epoch-second timestamps, categorical type codes, text
+    lengths and per-call metrics in NumPy arrays. sync() only fetches rows added since the last call,
+    so filter changes and reruns never re-read or re-parse existing entries. The frame is shared by
+    all sessions of a user, so it is queried through the AnalyticsSnapshot that sync() returns:
+    rows are only ever appended past the end of a snapshot, and a rebuild writes into new buffers.
+    """
+
+    def __init__(self, initial_capacity=1024):
+        self._initial_capacity = initial_capacity
+        self._allocate()
+        self.lock = threading.Lock()
+
+    def _allocate(self):
+        capacity = self._initial_capacity
+        self._size = 0
+        self._ids = np.empty(capacity, dtype=np.int64)
+        self._created_at = np.empty(capacity, dtype=np.int64)
+        self._type_codes = np.empty(capacity, dtype=np.int16)
+        self._input_lengths = np.empty(capacity, dtype=np.int32)
+        self._output_lengths = np.empty(capacity, dtype=np.int32)
+        self._latency_ms = np.empty(capacity, dtype=np.float64)
+        self._ttft_ms = np.empty(capacity, dtype=np.float64)
+        self._prompt_tokens = np.empty(capacity, dtype=np.int32)
+        self._completion_tokens = np.empty(capacity, dtype=np.int32)
+        self._cached = np.empty(capacity, dtype=bool)
+        self.categories = []
+        self._category_codes = {}
+        self.last_id = 0
+
+    def __len__(self):
+        return self._size
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        capacity = len(self._ids)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in COLUMNS:
+            old = getattr(self, "_" + name)
+            grown = np.empty(capacity, dtype=old.dtype)
+            grown[:self._size] = old[:self._size]
+            setattr(self, "_" + name, grown)
+
+    def _code_for(self, entry_type):
+        code = self._category_codes.get(entry_type)
+        if code is None:
+            code = len(self.categories)
+            self.categories.append(entry_type)
+            self._category_codes[entry_type] = code
+        return code
+
+    def extend(self, rows):
+        """Append rows shaped like HistoryStore.iter_column_chunks output, in id order"""
+        rows = list(rows)
+        if not rows:
+            return
+        self._reserve(len(rows))
+        start, end = self._size, self._size + len(rows)
+        (ids, created_at, types, input_lengths, output_lengths,
+         latency_ms, ttft_ms, prompt_tokens, completion_tokens, cached) = zip(*rows)
+        self._ids[start:end] = ids
+        self._created_at[start:end] = created_at
+        self._type_codes[start:end] = [self._code_for(entry_type) for entry_type in types]
+        self._input_lengths[start:end] = input_lengths
+        self._output_lengths[start:end] = output_lengths
+        # Missing timings (older entries, cache hits without a stream) become NaN
+        self._latency_ms[start:end] = latency_ms
+        self._ttft_ms[start:end] = ttft_ms
+        self._prompt_tokens[start:end] = prompt_tokens
+        self._completion_tokens[start:end] = completion_tokens
+        self._cached[start:end] = cached
+        self._size = end
+        self.last_id = int(ids[-1])
+
+    def reset(self):
+        """Drop all rows; new buffers are allocated so earlier snapshots keep their data"""
+        self._allocate()
+
+    def snapshot(self):
+        """Return an AnalyticsSnapshot of the rows synced so far; call with the lock held"""
+        return AnalyticsSnapshot(
+            {name: getattr(self, "_" + name)[:self._size] for name in COLUMNS}, self.categories
+        )
+
+    def sync(self, store, username):
+        """Pull rows recorded since the last sync, rebuilding if entries were deleted, and return a snapshot"""
+        with self.lock:
+            for rows in store.iter_column_chunks(username, after_id=self.last_id):
+                self.extend(rows)
+            if store.count(username) != self._size:
+                self.reset()
+                for rows in store.iter_column_chunks(username):
+                    self.extend(rows)
+            return self.snapshot()
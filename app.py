@@ -1,8 +1,31 @@
 import streamlit as st
-from openai import OpenAI
-from datetime import datetime
+import time
 import json
 import hashlib
+from contextlib import contextmanager
+from analysis import (
+    ANALYSIS_TYPE_LABELS,
+    FRAMEWORKS,
+    URGENCY_LEVELS,
+    check_openai_connection,
+    compose_input,
+    create_session_history,
+    get_history_store,
+    get_job_manager,
+    get_project_store,
+    get_rate_limiter,
+    get_response_cache,
+    get_semantic_cache,
+    record_analysis,
+    start_client_warm_up,
+    submit_analysis_job
+)
+from jobs import CANCELLED, DONE, FAILED
+from projects import token_savings
+from settings import get_setting
+
+# Start of this script run, for the debug overlay
+SCRIPT_STARTED = time.perf_counter()
 
 # Page configuration
 st.set_page_config(
@@ -18,11 +41,25 @@ VALID_CREDENTIALS = {
     "manager": hashlib.sha256("change2024".encode()).hexdigest()
 }
 
+# Result headings shown for each analysis type
+ANALYSIS_HEADINGS = {
+    "risk_detection": "### 🎯 Risk Analysis Results",
+    "change_guidance": "### 📚 Best Practice Guidance",
+    "team_analysis": "### 👥 Team Dynamics Insights",
+    "recommendations": "### 💡 Strategic Action Plan"
+}
+
+# Project choices in the Risk Detection tab besides the user's existing projects
+NO_PROJECT = "No project"
+NEW_PROJECT = "➕ New project"
+
 # Initialize session state
 if 'authenticated' not in st.session_state:
     st.session_state.authenticated = False
 if 'chat_history' not in st.session_state:
-    st.session_state.chat_history = []
+    st.session_state.chat_history = create_session_history()
+if 'jobs' not in st.session_state:
+    st.session_state.jobs = {}
 
 # Initialize API key from secrets (automatic, secure)
 if 'openai_api_key' not in st.session_state:
@@ -65,126 +102,131 @@ def login_page():
         
         st.markdown("---")
         st.info("**Demo Credentials:**\n\nUsername: `admin` | Password: `transform2024`\n\nUsername: `manager` | Password: `change2024`")
+    
+    # The page is on screen; get the OpenAI SDK loaded while the user types their credentials
+    if st.session_state.openai_api_key and get_setting("OPENAI_WARM_UP", True):
+        start_client_warm_up(st.session_state.openai_api_key)
 
-def get_openai_client():
-    """Get OpenAI client instance"""
-    if st.session_state.openai_api_key:
-        try:
-            return OpenAI(api_key=st.session_state.openai_api_key)
-        except Exception as e:
-            st.error(f"Error initializing OpenAI client: {str(e)}")
-            return None
-    return None
+def start_analysis(job_key, user_input, analysis_type, history_type, history_input, urgency=None, project=None):
+    """Queue an analysis in the background and remember its job for this session under job_key"""
+    job = submit_analysis_job(
+        user_input, analysis_type, history_type, history_input,
+        use_cache=st.session_state.use_cache, urgency=urgency, project=project
+    )
+    st.session_state.jobs.setdefault(job_key, []).append(job.id)
+    return job
 
-def analyze_transformation_data(user_input, analysis_type):
-    """Analyze transformation data using OpenAI"""
-    client = get_openai_client()
-    if not client:
-        return "Please configure your OpenAI API key in Streamlit Cloud secrets."
-    
-    system_prompts = {
-        "risk_detection": """You are a transformation management expert specializing in risk detection. 
-        Analyze the provided information for early warning signs of resistance, delays, or issues. 
-        Identify patterns that might indicate problems 2-3 weeks ahead. Provide specific, actionable insights.""",
-        
-        "change_guidance": """You are a change management consultant providing practical guidance. 
-        Based on the situation described, provide contextually relevant best practices from proven frameworks 
-        like ADKAR, Kotter's 8-Step Process, or Prosci methodology. Be specific and actionable.""",
-        
-        "team_analysis": """You are analyzing team communications and sentiment. 
-        Identify resistance patterns, engagement levels, and collaboration issues. 
-        Highlight both positive indicators and areas of concern.""",
-        
-        "recommendations": """You are providing strategic recommendations for transformation success. 
-        Based on the current situation, suggest targeted interventions, timeline adjustments, 
-        and stakeholder management strategies."""
-    }
-    
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": system_prompts.get(analysis_type, system_prompts["risk_detection"])},
-                {"role": "user", "content": user_input}
-            ],
-            temperature=0.7,
-            max_tokens=1000
-        )
-        return response.choices[0].message.content
-    except Exception as e:
-        error_msg = str(e)
-        if "rate_limit" in error_msg.lower():
-            return "⚠️ Rate limit exceeded. Please wait a moment and try again."
-        elif "insufficient_quota" in error_msg.lower():
-            return "⚠️ Insufficient API credits. Please check your OpenAI account balance."
-        elif "invalid_api_key" in error_msg.lower():
-            return "⚠️ Invalid API key. Please check your OpenAI API key in Streamlit secrets."
-        else:
-            return f"⚠️ Error: {error_msg}\n\nPlease check your API key and ensure you have sufficient credits."
+def session_jobs(job_key=None):
+    """Return this session's background jobs, optionally only those started under job_key"""
+    manager = get_job_manager()
+    keys = [job_key] if job_key else list(st.session_state.jobs)
+    jobs = (manager.get(job_id, st.session_state.username)
+            for key in keys for job_id in st.session_state.jobs.get(key, []))
+    return [job for job in jobs if job is not None]
 
-def main_app():
-    """Main application interface"""
-    
-    # Sidebar
-    with st.sidebar:
-        st.title("⚙️ Configuration")
-        
-        # API Key Status Display (No manual entry needed)
-        st.markdown("### 🔑 API Status")
-        if st.session_state.openai_api_key:
-            st.success("✅ OpenAI Connected")
-            st.caption("Securely configured via secrets")
+def collect_finished_jobs():
+    """Add analyses that finished in the background to this session's history"""
+    for job in session_jobs():
+        if job.status == DONE and not job.recorded:
+            record_analysis(job.history_type, job.history_input, job.result, created_at=job.finished_at, persist=False)
+            job.recorded = True
+
+def render_job(job, spinner_text, success_text):
+    """Render a background analysis: live progress while it runs, the result once it is done"""
+    heading = ANALYSIS_HEADINGS[job.analysis_type]
+    if job.status == DONE:
+        st.success(success_text)
+        st.markdown(heading)
+        st.markdown(job.result.text)
+        if job.result.cache_similarity is not None:
+            st.caption(f"♻️ Served from cache: {job.result.cache_similarity:.0%} similar to an earlier request")
+        elif job.result.coalesced:
+            st.caption("♻️ Shared with an identical request that was already running")
+        elif job.result.status == "cached":
+            st.caption("♻️ Served from cache")
+        if job.error:
+            st.warning(f"Not saved to the analysis history: {job.error}")
+        cleaned = job.result.preprocess
+        if cleaned is not None and cleaned.tokens_after < cleaned.tokens_before:
+            st.caption(
+                f"🧹 Quoted replies, signatures and duplicates removed before sending: "
+                f"{cleaned.tokens_before:,} → {cleaned.tokens_after:,} tokens ({cleaned.saved_share:.0%} fewer)"
+            )
+    elif job.status == FAILED:
+        st.error(f"⚠️ Error: {job.error}")
+    elif job.status == CANCELLED:
+        st.info(f"{ANALYSIS_TYPE_LABELS[job.analysis_type]} cancelled.")
+    else:
+        st.markdown(heading)
+        # Long inputs are analysed section by section; show how far along that is
+        if job.progress:
+            done, total = job.progress
+            st.progress(done / total, text=f"Analyzed section {done} of {total}")
+        if st.session_state.stream_responses and job.partial_text:
+            st.markdown(job.partial_text + "▌")
         else:
-            st.error("❌ API Key Missing")
-            st.caption("Configure in Streamlit Cloud secrets")
-            with st.expander("ℹ️ Setup Instructions"):
-                st.markdown("""
-                **Streamlit Cloud:**
-                1. Go to app Settings → Secrets
-                2. Add: `OPENAI_API_KEY = "sk-..."`
-                
-                **Local Development:**
-                1. Create `.streamlit/secrets.toml`
-                2. Add: `OPENAI_API_KEY = "sk-..."`
-                """)
-        
-        st.markdown("---")
-        
-        # User info
-        st.markdown(f"**Logged in as:** {st.session_state.username}")
-        if st.button("Logout", use_container_width=True):
-            st.session_state.authenticated = False
-            st.session_state.chat_history = []
-            st.rerun()
-        
-        st.markdown("---")
-        
-        # Quick stats
-        st.markdown("### 📊 Quick Stats")
-        st.metric("Analysis Count", len(st.session_state.chat_history))
-        # removed session duration as it is confusing st.metric("Session Duration", f"{(datetime.now().hour - 9) % 12}h")
-        
-        st.markdown("---")
-        
-        # Clear history
-        if st.button("Clear History", use_container_width=True):
-            st.session_state.chat_history = []
+            st.caption(f"⏳ {spinner_text}")
+        if st.button("Cancel", key=f"cancel_{job.id}"):
+            get_job_manager().cancel(job.id, st.session_state.username)
             st.rerun()
-    
-    # Main content
-    st.title("🔄 Transformation Management Assistant")
-    st.markdown("**Real-time transformation monitoring and change management guidance**")
-    st.markdown("---")
-    
-    # Tabs for different functions
-    tab1, tab2, tab3, tab4 = st.tabs([
-        "🔍 Risk Detection",
-        "📋 Change Guidance",
-        "👥 Team Analysis",
-        "💡 Recommendations"
-    ])
-    
-    with tab1:
+
+def render_jobs(job_key, spinner_text, success_text):
+    """Render the most recent analysis started under job_key"""
+    job_ids = st.session_state.jobs.get(job_key)
+    if job_ids:
+        job = get_job_manager().get(job_ids[-1], st.session_state.username)
+        if job is not None:
+            render_job(job, spinner_text, success_text)
+
+def render_all_jobs():
+    """Render every analysis of the latest Run All"""
+    all_jobs = session_jobs("all")
+    for job in all_jobs:
+        label = ANALYSIS_TYPE_LABELS[job.analysis_type]
+        render_job(job, f"Running {label}...", f"{label} complete!")
+    if all_jobs and all(job.status == DONE for job in all_jobs):
+        st.success("All analyses complete!")
+
+def job_panel(job_key, render):
+    """Call render() for the jobs under job_key, refreshing it on a timer while any of them is running"""
+    jobs = session_jobs(job_key)
+    if any(not job.finished for job in jobs):
+        polling_job_panel(job_key, render)
+        return
+    render()
+    if any(job.status == DONE and not job.recorded for job in jobs):
+        # Finished after collect_finished_jobs ran; rerun so the result reaches the session history
+        st.rerun()
+
+@st.fragment(run_every=get_setting("JOB_POLL_SECONDS", 0.5))
+def polling_job_panel(job_key, render):
+    """Only this panel reruns while jobs are running; the whole page reruns once when they finish"""
+    render()
+    if all(job.finished for job in session_jobs(job_key)):
+        # Picks the results up into the session history and stops the timer
+        st.rerun()
+
+def debug_overlay_enabled():
+    """Render timings are shown with the DEBUG_OVERLAY setting or ?debug=1 in the URL"""
+    return get_setting("DEBUG_OVERLAY", False) or st.query_params.get("debug") == "1"
+
+@contextmanager
+def timed_section(name):
+    """Time the rendering of a page section and report it under the section in debug mode"""
+    started = time.perf_counter()
+    yield
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    st.session_state.render_timings[name] = elapsed_ms
+    if debug_overlay_enabled():
+        st.caption(f"🐞 {name} rendered in {elapsed_ms:.1f} ms")
+
+# Each tab and the history panel is a fragment: interacting with its widgets
+# reruns only that section instead of the whole page
+
+@st.fragment
+def risk_tab():
+    """Risk detection tab"""
+    with timed_section("Risk Detection"):
         st.header("Risk Detection & Early Warning")
         st.markdown("Identify transformation risks 2-3 weeks early through pattern analysis")
         
@@ -194,25 +236,46 @@ def main_app():
             placeholder="E.g., Team meeting notes, email summaries, project updates..."
         )
         
+        # Tracked projects send only new log entries plus a rolling summary
+        project_store = get_project_store()
+        project_choice = st.selectbox(
+            "Track as project (optional)",
+            [NO_PROJECT] + project_store.names(st.session_state.username) + [NEW_PROJECT],
+            key="risk_project",
+            help="Paste the project's full cumulative log each time: only entries added since the last "
+                 "update are sent, together with a stored summary of the earlier ones."
+        )
+        project = None if project_choice == NO_PROJECT else project_choice
+        if project_choice == NEW_PROJECT:
+            project = st.text_input("Project name", key="risk_new_project").strip() or None
+        state = project_store.get(st.session_state.username, project) if project else None
+        if state:
+            saved, share = token_savings(state)
+            st.caption(
+                f"📉 {state['submissions']} update(s) so far · net {saved:,} prompt tokens saved "
+                f"({share:.0%}) compared with resending the full log"
+            )
+        
         if st.button("Analyze Risks", key="risk_btn"):
-            if risk_input and st.session_state.openai_api_key:
-                with st.spinner("Analyzing for risk patterns..."):
-                    result = analyze_transformation_data(risk_input, "risk_detection")
-                    st.session_state.chat_history.append({
-                        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M"),
-                        "type": "Risk Detection",
-                        "input": risk_input,
-                        "output": result
-                    })
-                    st.success("Analysis Complete!")
-                    st.markdown("### 🎯 Risk Analysis Results")
-                    st.markdown(result)
+            if project_choice == NEW_PROJECT and not project:
+                st.warning("Please name the new project.")
+            elif risk_input and st.session_state.openai_api_key:
+                start_analysis(
+                    "risk_detection", risk_input, "risk_detection", "Risk Detection", risk_input, project=project
+                )
             elif not st.session_state.openai_api_key:
                 st.error("Please configure your OpenAI API key in the sidebar.")
             else:
                 st.warning("Please provide input for analysis.")
-    
-    with tab2:
+        
+        job_panel("risk_detection", lambda: render_jobs(
+            "risk_detection", "Analyzing for risk patterns...", "Analysis Complete!"
+        ))
+
+@st.fragment
+def guidance_tab():
+    """Change guidance tab"""
+    with timed_section("Change Guidance"):
         st.header("Change Management Guidance")
         st.markdown("Get contextually relevant best practices from proven frameworks")
         
@@ -224,29 +287,26 @@ def main_app():
         
         framework = st.selectbox(
             "Preferred Framework (optional)",
-            ["Auto-select", "ADKAR", "Kotter's 8-Step", "Prosci", "McKinsey 7-S"]
+            FRAMEWORKS
         )
         
         if st.button("Get Guidance", key="guidance_btn"):
             if guidance_input and st.session_state.openai_api_key:
-                full_input = f"{guidance_input}\n\nPreferred framework: {framework}" if framework != "Auto-select" else guidance_input
-                with st.spinner("Generating guidance..."):
-                    result = analyze_transformation_data(full_input, "change_guidance")
-                    st.session_state.chat_history.append({
-                        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M"),
-                        "type": "Change Guidance",
-                        "input": guidance_input,
-                        "output": result
-                    })
-                    st.success("Guidance Generated!")
-                    st.markdown("### 📚 Best Practice Guidance")
-                    st.markdown(result)
+                full_input = compose_input(guidance_input, "change_guidance", framework=framework)
+                start_analysis("change_guidance", full_input, "change_guidance", "Change Guidance", guidance_input)
             elif not st.session_state.openai_api_key:
                 st.error("Please configure your OpenAI API key in the sidebar.")
             else:
                 st.warning("Please describe your challenge.")
-    
-    with tab3:
+        
+        job_panel("change_guidance", lambda: render_jobs(
+            "change_guidance", "Generating guidance...", "Guidance Generated!"
+        ))
+
+@st.fragment
+def team_tab():
+    """Team analysis tab"""
+    with timed_section("Team Analysis"):
         st.header("Team Communication Analysis")
         st.markdown("Analyze team sentiment and identify resistance patterns")
         
@@ -258,23 +318,20 @@ def main_app():
         
         if st.button("Analyze Team Dynamics", key="team_btn"):
             if team_input and st.session_state.openai_api_key:
-                with st.spinner("Analyzing team communications..."):
-                    result = analyze_transformation_data(team_input, "team_analysis")
-                    st.session_state.chat_history.append({
-                        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M"),
-                        "type": "Team Analysis",
-                        "input": team_input,
-                        "output": result
-                    })
-                    st.success("Analysis Complete!")
-                    st.markdown("### 👥 Team Dynamics Insights")
-                    st.markdown(result)
+                start_analysis("team_analysis", team_input, "team_analysis", "Team Analysis", team_input)
             elif not st.session_state.openai_api_key:
                 st.error("Please configure your OpenAI API key in the sidebar.")
             else:
                 st.warning("Please provide team communications to analyze.")
-    
-    with tab4:
+        
+        job_panel("team_analysis", lambda: render_jobs(
+            "team_analysis", "Analyzing team communications...", "Analysis Complete!"
+        ))
+
+@st.fragment
+def recommendations_tab():
+    """Strategic recommendations tab"""
+    with timed_section("Recommendations"):
         st.header("Strategic Recommendations")
         st.markdown("Get targeted interventions and action plans")
         
@@ -286,39 +343,262 @@ def main_app():
         
         urgency = st.select_slider(
             "Situation Urgency",
-            options=["Low", "Medium", "High", "Critical"]
+            options=URGENCY_LEVELS
         )
         
         if st.button("Generate Recommendations", key="rec_btn"):
             if situation and st.session_state.openai_api_key:
-                full_input = f"{situation}\n\nUrgency level: {urgency}"
-                with st.spinner("Generating recommendations..."):
-                    result = analyze_transformation_data(full_input, "recommendations")
-                    st.session_state.chat_history.append({
-                        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M"),
-                        "type": "Recommendations",
-                        "input": situation,
-                        "output": result
-                    })
-                    st.success("Recommendations Ready!")
-                    st.markdown("### 💡 Strategic Action Plan")
-                    st.markdown(result)
+                full_input = compose_input(situation, "recommendations", urgency=urgency)
+                start_analysis(
+                    "recommendations", full_input, "recommendations", "Recommendations", situation, urgency=urgency
+                )
             elif not st.session_state.openai_api_key:
                 st.error("Please configure your OpenAI API key in the sidebar.")
             else:
                 st.warning("Please describe the situation.")
-    
-    # Display history
-    if st.session_state.chat_history:
+        
+        job_panel("recommendations", lambda: render_jobs(
+            "recommendations", "Generating recommendations...", "Recommendations Ready!"
+        ))
+
+@st.fragment
+def run_all_tab():
+    """Tab that runs all four analyses on one input"""
+    with timed_section("Run All"):
+        st.header("Complete Analysis")
+        st.markdown("Run all four analyses on the same input at once")
+        
+        all_input = st.text_area(
+            "Describe the situation, or paste status reports and team communications:",
+            height=150,
+            placeholder="E.g., Project update, meeting notes, stakeholder feedback..."
+        )
+        
+        col_framework, col_urgency = st.columns(2)
+        with col_framework:
+            all_framework = st.selectbox("Preferred Framework (optional)", FRAMEWORKS, key="all_framework")
+        with col_urgency:
+            all_urgency = st.select_slider("Situation Urgency", options=URGENCY_LEVELS, key="all_urgency")
+        
+        if st.button("Run All Analyses", key="all_btn"):
+            if all_input and st.session_state.openai_api_key:
+                # One background job per analysis type; they run concurrently on the job pool.
+                # Urgency only applies to recommendations, as on its own tab
+                st.session_state.jobs["all"] = []
+                for analysis_type, label in ANALYSIS_TYPE_LABELS.items():
+                    urgency = all_urgency if analysis_type == "recommendations" else None
+                    start_analysis(
+                        "all", compose_input(all_input, analysis_type, all_framework, urgency),
+                        analysis_type, label, all_input, urgency=urgency
+                    )
+            elif not st.session_state.openai_api_key:
+                st.error("Please configure your OpenAI API key in the sidebar.")
+            else:
+                st.warning("Please provide input for analysis.")
+        
+        job_panel("all", render_all_jobs)
+
+@st.fragment
+def history_panel():
+    """Analysis history, newest first, paged from the persistent store or from this session's history"""
+    history_store = get_history_store()
+    session_history = st.session_state.chat_history
+    if not len(session_history) and not history_store.count(st.session_state.username):
+        return
+    with timed_section("Analysis History"):
         st.markdown("---")
         st.header("📜 Analysis History")
         
-        for i, entry in enumerate(reversed(st.session_state.chat_history[-5:])):
-            with st.expander(f"{entry['type']} - {entry['timestamp']}"):
-                st.markdown("**Input:**")
-                st.text(entry['input'][:200] + "..." if len(entry['input']) > 200 else entry['input'])
-                st.markdown("**Analysis:**")
-                st.markdown(entry['output'])
+        scope = st.radio(
+            "Show", ["All sessions", "This session"], horizontal=True, key="history_scope",
+            on_change=lambda: st.session_state.update(history_page=0)
+        )
+        if scope == "This session":
+            total_entries = len(session_history)
+            load_page = session_history.page
+        else:
+            total_entries = history_store.count(st.session_state.username)
+            load_page = lambda limit, offset: history_store.page(st.session_state.username, limit=limit, offset=offset)
+        if not total_entries:
+            st.caption("No analyses yet.")
+            return
+        
+        page_size = get_setting("HISTORY_PAGE_SIZE", 5)
+        page_count = (total_entries + page_size - 1) // page_size
+        page = min(st.session_state.get("history_page", 0), page_count - 1)
+        
+        for entry in load_page(limit=page_size, offset=page * page_size):
+            # Outputs are only rendered for entries the user opens
+            if st.toggle(f"{entry['type']} - {entry['timestamp']}", key=f"history_open_{scope}_{entry['id']}"):
+                with st.container(border=True):
+                    st.markdown("**Input:**")
+                    st.text(entry['input'][:200] + "..." if len(entry['input']) > 200 else entry['input'])
+                    st.markdown("**Analysis:**")
+                    st.markdown(entry['output'])
+        
+        if page_count > 1:
+            col_prev, col_page, col_next = st.columns([1, 2, 1])
+            with col_prev:
+                if st.button("◀ Newer", disabled=page == 0, use_container_width=True):
+                    st.session_state.history_page = page - 1
+                    st.rerun(scope="fragment")
+            with col_page:
+                st.caption(f"Page {page + 1} of {page_count} · {total_entries} analyses")
+            with col_next:
+                if st.button("Older ▶", disabled=page >= page_count - 1, use_container_width=True):
+                    st.session_state.history_page = page + 1
+                    st.rerun(scope="fragment")
+
+def main_app():
+    """Main application interface"""
+    
+    collect_finished_jobs()
+    st.session_state.render_timings = {}
+    
+    # Sidebar
+    with st.sidebar:
+        st.title("⚙️ Configuration")
+        
+        # API Key Status Display (No manual entry needed)
+        st.markdown("### 🔑 API Status")
+        if st.session_state.openai_api_key:
+            st.success("✅ OpenAI Connected")
+            st.caption("Securely configured via secrets")
+            if st.button("Check Connection", use_container_width=True):
+                healthy, message = check_openai_connection()
+                if healthy:
+                    st.caption(f"🟢 {message}")
+                else:
+                    st.warning(message)
+        else:
+            st.error("❌ API Key Missing")
+            st.caption("Configure in Streamlit Cloud secrets")
+            with st.expander("ℹ️ Setup Instructions"):
+                st.markdown("""
+                **Streamlit Cloud:**
+                1. Go to app Settings → Secrets
+                2. Add: `OPENAI_API_KEY = "sk-..."`
+                
+                **Local Development:**
+                1. Create `.streamlit/secrets.toml`
+                2. Add: `OPENAI_API_KEY = "sk-..."`
+                """)
+        
+        st.markdown("---")
+        
+        # User info
+        st.markdown(f"**Logged in as:** {st.session_state.username}")
+        if st.button("Logout", use_container_width=True):
+            st.session_state.authenticated = False
+            st.session_state.chat_history.clear()
+            st.session_state.jobs = {}
+            st.rerun()
+        
+        st.markdown("---")
+        
+        # Quick stats
+        st.markdown("### 📊 Quick Stats")
+        st.metric("Analysis Count", len(st.session_state.chat_history))
+        # removed session duration as it is confusing st.metric("Session Duration", f"{(datetime.now().hour - 9) % 12}h")
+        history_stats = st.session_state.chat_history.stats()
+        st.caption(
+            f"Session history: {history_stats['memory_bytes'] / 1024:.0f} KiB in memory, "
+            f"{history_stats['spilled']} entries on disk"
+        )
+        cache_stats = get_response_cache().stats()
+        st.caption(
+            f"Cache: {cache_stats['memory_hits'] + cache_stats['disk_hits']} hits / "
+            f"{cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%})"
+        )
+        semantic_cache = get_semantic_cache()
+        if semantic_cache is not None:
+            semantic_stats = semantic_cache.stats()
+            st.caption(
+                f"Similar-input cache: {semantic_stats['hits']} hits / {semantic_stats['misses']} misses, "
+                f"{semantic_stats['entries']} stored"
+            )
+        limiter_stats = get_rate_limiter().stats()
+        st.caption(
+            f"API slots: {limiter_stats['in_flight']}/{limiter_stats['concurrency_limit']} in use, "
+            f"{limiter_stats['waiting']} queued"
+        )
+        
+        st.markdown("---")
+        
+        # Response options
+        st.markdown("### ⚡ Response Options")
+        st.checkbox(
+            "Stream responses",
+            value=True,
+            key="stream_responses",
+            help="Show the analysis as it is generated instead of waiting for the full answer."
+        )
+        st.checkbox(
+            "Reuse cached answers",
+            value=True,
+            key="use_cache",
+            help="Identical requests are answered from a shared cache. Untick to force a fresh analysis."
+        )
+        
+        st.markdown("---")
+        
+        # Clear history; the saved history cannot be restored, so ask first
+        if st.session_state.get("confirm_clear_history"):
+            st.warning("This permanently deletes your saved analysis history, including earlier sessions.")
+            col_delete, col_keep = st.columns(2)
+            with col_delete:
+                if st.button("Delete", type="primary", use_container_width=True):
+                    st.session_state.chat_history.clear()
+                    get_history_store().delete_user(st.session_state.username)
+                    st.session_state.history_page = 0
+                    st.session_state.confirm_clear_history = False
+                    st.rerun()
+            with col_keep:
+                if st.button("Keep", use_container_width=True):
+                    st.session_state.confirm_clear_history = False
+                    st.rerun()
+        elif st.button("Clear History", use_container_width=True):
+            st.session_state.confirm_clear_history = True
+            st.rerun()
+        
+        # Filled in at the end of the run, once every section has been timed
+        debug_slot = st.empty()
+    
+    # Main content
+    st.title("🔄 Transformation Management Assistant")
+    st.markdown("**Real-time transformation monitoring and change management guidance**")
+    st.markdown("---")
+    
+    # Tabs for different functions
+    tab1, tab2, tab3, tab4, tab5 = st.tabs([
+        "🔍 Risk Detection",
+        "📋 Change Guidance",
+        "👥 Team Analysis",
+        "💡 Recommendations",
+        "🚀 Run All"
+    ])
+    
+    with tab1:
+        risk_tab()
+    with tab2:
+        guidance_tab()
+    with tab3:
+        team_tab()
+    with tab4:
+        recommendations_tab()
+    with tab5:
+        run_all_tab()
+    
+    history_panel()
+    
+    # Debug overlay: cost of this full run; sections rerun on their own report inline
+    if debug_overlay_enabled():
+        with debug_slot.container():
+            st.markdown("---")
+            st.markdown("### 🐞 Render Timings")
+            st.caption(f"Full script run: {(time.perf_counter() - SCRIPT_STARTED) * 1000:.1f} ms")
+            for name, elapsed_ms in st.session_state.render_timings.items():
+                st.caption(f"{name}: {elapsed_ms:.1f} ms")
 
 # Main application logic
 if not st.session_state.authenticated:
@@ -0,0 +1,33 @@
+import sqlite3
+import threading
+
+# Seconds a connection waits for another process's write lock before raising
+BUSY_TIMEOUT_SECONDS = 10.0
+
+class ThreadLocalConnection:
+    """One SQLite connection per thread to a database file shared by worker processes.
+
+    sqlite3 connections cannot be shared between threads, so each thread opens its
+    own on first use. Every connection uses WAL journaling, so readers in other
+    processes never block the writer, and synchronous=NORMAL, which is durable in
+    WAL mode except for the last commits before a power loss. Pass
+    isolation_level=None for autocommit with explicit BEGIN statements.
+    """
+
+    def __init__(self, path, row_factory=None, isolation_level=""):
+        self.path = path
+        self.row_factory = row_factory
+        self.isolation_level = isolation_level
+        self._local = threading.local()
+
+    def get(self):
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=self.isolation_level)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            if self.row_factory is not None:
+                conn.row_factory = self.row_factory
+            self._local.conn = conn
+        return conn
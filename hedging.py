@@ -0,0 +1,191 @@
+import math
+import threading
+import time
+from collections import deque
+
+# Seconds an analysis may take in total, including retries and fallbacks, per analysis type
+DEFAULT_DEADLINE_SECONDS = {
+    "risk_detection": 120.0,
+    "change_guidance": 150.0,
+    "team_analysis": 120.0,
+    "recommendations": 150.0,
+}
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when an analysis has not finished within its deadline"""
+
+    def __init__(self, seconds):
+        super().__init__(f"No answer within {seconds:g} seconds")
+        self.seconds = seconds
+
+class HedgeLost(Exception):
+    """Raised inside an attempt that lost the race, or was abandoned at the deadline, to stop it"""
+
+class Deadline:
+    """Point in time by which an analysis, including retries and fallbacks, must have finished"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.at - time.monotonic())
+
+    @property
+    def expired(self):
+        return time.monotonic() >= self.at
+
+class Hedger:
+    """Sends a duplicate of a slow request and keeps whichever answers first.
+
+    Recent latencies (to the first streamed token, or to the whole response) are
+    tracked per key, e.g. model, analysis type and whether the call streams. Once
+    a key has min_samples of them, a request that has not answered by their
+    percentile (but at least min_delay_seconds) is hedged with a duplicate; the
+    first attempt to produce output wins and the other is stopped at its next
+    token or discarded. Every request earns max_rate of a hedge credit, up to
+    burst, and each hedge spends one, so hedges stay within about max_rate of
+    requests. With hedging disabled, run() still enforces the deadline.
+    """
+
+    def __init__(self, enabled=False, percentile=95, min_samples=20, min_delay_seconds=1.0, max_rate=0.05,
+                 burst=3.0, window=500):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay_seconds = min_delay_seconds
+        self.max_rate = max_rate
+        self.burst = burst
+        self.window = window
+        self._latencies = {}
+        self._credit = 0.0
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def observe(self, key, seconds):
+        with self._lock:
+            samples = self._latencies.get(key)
+            if samples is None:
+                samples = self._latencies[key] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def hedge_delay(self, key):
+        """Seconds to wait before hedging a request for key, or None while hedging does not apply"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            samples = sorted(self._latencies.get(key, ()))
+        if len(samples) < self.min_samples:
+            return None
+        index = min(len(samples) - 1, max(0, math.ceil(self.percentile / 100 * len(samples)) - 1))
+        return max(self.min_delay_seconds, samples[index])
+
+    def _start_request(self):
+        with self._lock:
+            self.requests += 1
+            self._credit = min(self.burst, self._credit + self.max_rate)
+
+    def _spend_credit(self):
+        with self._lock:
+            if self._credit < 1.0:
+                return False
+            self._credit -= 1.0
+            self.hedges += 1
+            return True
+
+    def stats(self):
+        with self._lock:
+            return {"requests": self.requests, "hedges": self.hedges, "hedge_wins": self.hedge_wins}
+
+    def run(self, key, attempt, deadline=None, on_hedge=None):
+        """Return attempt(claim), hedged with a second attempt(claim) if the first is slow
+
+        Attempts run on their own threads. A streaming attempt must call claim()
+        before passing on each token; claim raises HedgeLost in an attempt that
+        lost the race, so it can close its stream. Non-streaming attempts claim
+        when they return. Raises DeadlineExceeded once deadline (a Deadline) passes
+        without an answer, or the error of the last attempt if all of them failed.
+        on_hedge() is called when the duplicate is sent.
+        """
+        self._start_request()
+        delay = self.hedge_delay(key)
+        if delay is None and deadline is None:
+            started = time.monotonic()
+            value = attempt(lambda: None)
+            self.observe(key, time.monotonic() - started)
+            return value
+
+        condition = threading.Condition()
+        state = {"winner": None, "abandoned": False}
+        outcomes = {}
+        started_at = {}
+
+        def claim_for(index):
+            def claim():
+                with condition:
+                    if state["winner"] is None and not state["abandoned"]:
+                        state["winner"] = index
+                        self.observe(key, time.monotonic() - started_at[index])
+                        condition.notify_all()
+                    if state["winner"] != index or state["abandoned"]:
+                        raise HedgeLost()
+            return claim
+
+        def launch(index):
+            started_at[index] = time.monotonic()
+            claim = claim_for(index)
+
+            def target():
+                try:
+                    value = attempt(claim)
+                    claim()
+                    outcome = (True, value)
+                except BaseException as e:
+                    outcome = (False, e)
+                with condition:
+                    outcomes[index] = outcome
+                    condition.notify_all()
+
+            threading.Thread(target=target, name=f"{threading.current_thread().name}-attempt-{index}",
+                             daemon=True).start()
+
+        launch(0)
+        launched = 1
+        hedge_at = None if delay is None else time.monotonic() + delay
+        with condition:
+            while True:
+                winner = state["winner"]
+                if winner is not None and winner in outcomes:
+                    succeeded, value = outcomes[winner]
+                    break
+                if winner is None and len(outcomes) == launched:
+                    # Every attempt failed; prefer a real error over a lost race
+                    errors = [error for _, error in outcomes.values() if not isinstance(error, HedgeLost)]
+                    succeeded, value = False, errors[-1] if errors else outcomes[launched - 1][1]
+                    break
+                now = time.monotonic()
+                if deadline is not None and now >= deadline.at:
+                    state["abandoned"] = True
+                    raise DeadlineExceeded(deadline.seconds)
+                if hedge_at is not None and winner is None and now >= hedge_at:
+                    hedge_at = None
+                    if self._spend_credit():
+                        launch(1)
+                        launched = 2
+                        if on_hedge is not None:
+                            on_hedge()
+                    continue
+                waits = []
+                if deadline is not None:
+                    waits.append(deadline.at - now)
+                if hedge_at is not None and winner is None:
+                    waits.append(hedge_at - now)
+                condition.wait(min(waits) if waits else None)
+        if state["winner"] == 1:
+            with self._lock:
+                self.hedge_wins += 1
+        if succeeded:
+            return value
+        raise value
@@ -0,0 +1,100 @@
+import csv
+import io
+import json
+import os
+import time
+from history_store import METRIC_COLUMNS
+
+# Export format -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "JSONL": ("jsonl", "application/jsonl"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+EXPORT_COLUMNS = ["id", "timestamp", "created_at", "type", "input", "output"] + list(METRIC_COLUMNS)
+
+def iter_csv_chunks(entries, chunk_rows=1000):
+    """Yield CSV text for entries, chunk_rows rows at a time, starting with the header"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    rows = 0
+    for entry in entries:
+        writer.writerow(entry)
+        rows += 1
+        if rows % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def iter_jsonl_chunks(entries, chunk_rows=1000):
+    """Yield JSON Lines text for entries, chunk_rows rows at a time"""
+    lines = []
+    for entry in entries:
+        lines.append(json.dumps({column: entry.get(column) for column in EXPORT_COLUMNS}, ensure_ascii=False) + "\n")
+        if len(lines) == chunk_rows:
+            yield "".join(lines)
+            lines = []
+    yield "".join(lines)
+
+def _parquet_schema(pa):
+    column_types = {"id": pa.int64(), "timestamp": pa.string(), "created_at": pa.float64(), "type": pa.string(),
+                    "input": pa.string(), "output": pa.string()}
+    sql_types = {"REAL": pa.float64(), "INTEGER": pa.int64(), "TEXT": pa.string()}
+    column_types.update({column: sql_types[sql_type] for column, sql_type in METRIC_COLUMNS.items()})
+    return pa.schema([(column, column_types[column]) for column in EXPORT_COLUMNS])
+
+def write_parquet(entries, path, chunk_rows=5000):
+    """Write entries to a Parquet file, one row group per chunk_rows entries"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema(pa)
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        batch = []
+        for entry in entries:
+            batch.append(entry)
+            if len(batch) == chunk_rows:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                batch = []
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+
+def export_history(store, username, path, export_format, types=None, search=None, chunk_rows=1000):
+    """Write a user's matching history to path, oldest first, without holding it all in memory
+
+    Entries are read from the store chunk_rows at a time and written as they are
+    read; the file is written under a temporary name and renamed once complete.
+    Returns the number of entries exported.
+    """
+    count = 0
+
+    def entries():
+        nonlocal count
+        for entry in store.iter_entries(username, types=types, search=search, chunk_size=chunk_rows):
+            count += 1
+            yield entry
+
+    partial_path = path + ".partial"
+    if export_format == "Parquet":
+        write_parquet(entries(), partial_path, chunk_rows=max(chunk_rows, 5000))
+    else:
+        chunks = iter_csv_chunks if export_format == "CSV" else iter_jsonl_chunks
+        with open(partial_path, "w", encoding="utf-8", newline="") as handle:
+            for chunk in chunks(entries(), chunk_rows):
+                handle.write(chunk)
+    os.replace(partial_path, path)
+    return count
+
+def prune_exports(directory, max_age_seconds=86400):
+    """Delete export files older than max_age_seconds, e.g. left behind by ended sessions"""
+    cutoff = time.time() - max_age_seconds
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
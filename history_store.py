@@ -0,0 +1,262 @@
+import re
+import sqlite3
+import time
+from datetime import datetime
+from db import ThreadLocalConnection
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M"
+
+# Per-call metrics stored with each entry; NULL for entries recorded before they existed
+METRIC_COLUMNS = {
+    "latency_ms": "REAL",
+    "ttft_ms": "REAL",
+    "prompt_tokens": "INTEGER",
+    "completion_tokens": "INTEGER",
+    "model": "TEXT",
+    "status": "TEXT",
+    "error_class": "TEXT",
+    "route": "TEXT",
+}
+
+def build_fts_query(text):
+    """Translate a user search string into an FTS5 MATCH expression
+
+    Quoted text becomes a phrase query, a trailing * marks a prefix, and the last
+    bare word is always treated as a prefix so results update while typing.
+    Every term is quoted, so FTS5 operators in user input are matched literally.
+    """
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', text):
+        if phrase:
+            words = re.findall(r"\w+", phrase)
+            if words:
+                terms.append(('"' + " ".join(words) + '"', False))
+        else:
+            for token in re.findall(r"\w+\*?", word):
+                terms.append(('"' + token.rstrip("*") + '"', token.endswith("*")))
+    if not terms:
+        return None
+    last, _ = terms[-1]
+    if not text.rstrip().endswith('"'):
+        terms[-1] = (last, True)
+    return " ".join(term + ("*" if prefix else "") for term, prefix in terms)
+
+class HistoryStore:
+    """Append-only SQLite store of completed analyses, keyed by username.
+
+    Entries are indexed on (username, created_at), (username, type, created_at)
+    and (username, id) so history pages, analytics aggregates and chunked scans
+    are answered by index range scans instead of loading a user's whole history
+    into memory. When SQLite has FTS5,
+    an external-content full-text index over input and output is maintained by
+    triggers as entries are recorded, and all text search goes through it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._db = ThreadLocalConnection(path, row_factory=sqlite3.Row)
+        self.fts_enabled = False
+        self._init_db()
+
+    def _connect(self):
+        return self._db.get()
+
+    def _init_db(self):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    type TEXT NOT NULL,
+                    input TEXT NOT NULL,
+                    output TEXT NOT NULL
+                )"""
+            )
+            existing = {row["name"] for row in conn.execute("PRAGMA table_info(history)")}
+            for column, column_type in METRIC_COLUMNS.items():
+                if column not in existing:
+                    try:
+                        conn.execute(f"ALTER TABLE history ADD COLUMN {column} {column_type}")
+                    except sqlite3.OperationalError as e:
+                        # Another worker process migrated the table first
+                        if "duplicate column" not in str(e):
+                            raise
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_history_user_time ON history (username, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_history_user_type_time ON history (username, type, created_at)")
+            # Lets chunked scans (exports, analytics sync) seek to the next id instead of re-sorting
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_history_user_id ON history (username, id)")
+        try:
+            with conn:
+                exists = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'history_fts'"
+                ).fetchone()
+                conn.execute(
+                    """CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(
+                        input, output, content='history', content_rowid='id'
+                    )"""
+                )
+                conn.execute(
+                    """CREATE TRIGGER IF NOT EXISTS history_fts_insert AFTER INSERT ON history BEGIN
+                        INSERT INTO history_fts (rowid, input, output) VALUES (new.id, new.input, new.output);
+                    END"""
+                )
+                conn.execute(
+                    """CREATE TRIGGER IF NOT EXISTS history_fts_delete AFTER DELETE ON history BEGIN
+                        INSERT INTO history_fts (history_fts, rowid, input, output)
+                        VALUES ('delete', old.id, old.input, old.output);
+                    END"""
+                )
+                if not exists:
+                    # Index entries recorded before full-text search was available
+                    conn.execute("INSERT INTO history_fts (history_fts) VALUES ('rebuild')")
+            self.fts_enabled = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5: fall back to LIKE scans
+            self.fts_enabled = False
+
+    def _where(self, username, types=None, search=None, prefix=""):
+        clauses, params = [f"{prefix}username = ?"], [username]
+        if types is not None:
+            if not types:
+                clauses.append("0")
+            else:
+                clauses.append(f"{prefix}type IN ({', '.join('?' * len(types))})")
+                params.extend(types)
+        if search:
+            match = build_fts_query(search) if self.fts_enabled else None
+            if match:
+                clauses.append(f"{prefix}id IN (SELECT rowid FROM history_fts WHERE history_fts MATCH ?)")
+                params.append(match)
+            elif self.fts_enabled:
+                clauses.append("0")
+            else:
+                clauses.append(f"({prefix}input LIKE ? OR {prefix}output LIKE ?)")
+                params.extend([f"%{search}%"] * 2)
+        return " AND ".join(clauses), params
+
+    @staticmethod
+    def _to_entry(row):
+        entry = dict(row)
+        entry["timestamp"] = datetime.fromtimestamp(entry["created_at"]).strftime(TIMESTAMP_FORMAT)
+        return entry
+
+    def append(self, username, entry_type, user_input, output, created_at=None, metrics=None):
+        """Record an analysis and return its id; metrics maps METRIC_COLUMNS names to values"""
+        metrics = {column: value for column, value in (metrics or {}).items() if column in METRIC_COLUMNS}
+        columns = ["username", "created_at", "type", "input", "output"] + list(metrics)
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                f"INSERT INTO history ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                [username, created_at or time.time(), entry_type, user_input, output] + list(metrics.values())
+            )
+        return cursor.lastrowid
+
+    def count(self, username, types=None, search=None):
+        """Number of entries matching the filters"""
+        where, params = self._where(username, types, search)
+        return self._connect().execute(f"SELECT COUNT(*) FROM history WHERE {where}", params).fetchone()[0]
+
+    def page(self, username, limit=5, offset=0, types=None, search=None):
+        """Return one page of entries, newest first"""
+        where, params = self._where(username, types, search)
+        rows = self._connect().execute(
+            f"SELECT * FROM history WHERE {where} ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+            params + [limit, offset]
+        ).fetchall()
+        return [self._to_entry(row) for row in rows]
+
+    def iter_entries(self, username, types=None, search=None, chunk_size=500):
+        """Yield matching entries oldest first, fetching chunk_size rows at a time"""
+        where, params = self._where(username, types, search)
+        last_id = 0
+        conn = self._connect()
+        while True:
+            rows = conn.execute(
+                f"SELECT * FROM history WHERE {where} AND id > ? ORDER BY id LIMIT ?",
+                params + [last_id, chunk_size]
+            ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._to_entry(row)
+            last_id = rows[-1]["id"]
+
+    def iter_column_chunks(self, username, after_id=0, chunk_size=5000):
+        """Yield lists of column tuples for entries after after_id
+
+        Each tuple is (id, created_at, type, input_length, output_length, latency_ms,
+        ttft_ms, prompt_tokens, completion_tokens, cached); unknown timings are None.
+        """
+        conn = self._connect()
+        while True:
+            rows = conn.execute(
+                """SELECT id, CAST(created_at AS INTEGER), type, length(input), length(output),
+                        latency_ms, ttft_ms, COALESCE(prompt_tokens, 0), COALESCE(completion_tokens, 0),
+                        COALESCE(status = 'cached', 0)
+                    FROM history WHERE username = ? AND id > ? ORDER BY id LIMIT ?""",
+                (username, after_id, chunk_size)
+            ).fetchall()
+            if not rows:
+                return
+            yield [tuple(row) for row in rows]
+            after_id = rows[-1][0]
+
+    def matching_ids(self, username, search):
+        """Return ids of entries whose input or output contains search"""
+        where, params = self._where(username, search=search)
+        return [row[0] for row in self._connect().execute(f"SELECT id FROM history WHERE {where}", params)]
+
+    def search(self, username, query, types=None, limit=20):
+        """Return the best-ranked entries for query with highlighted snippets, best first
+
+        Each entry gains `input_snippet` and `output_snippet` with matches wrapped in
+        ** for Markdown. Without FTS5, entries are returned newest first and the
+        snippets are plain excerpts.
+        """
+        if not self.fts_enabled:
+            entries = self.page(username, limit=limit, types=types, search=query)
+            for entry in entries:
+                entry["input_snippet"] = entry["input"][:200]
+                entry["output_snippet"] = entry["output"][:200]
+            return entries
+        match = build_fts_query(query)
+        if not match:
+            return []
+        where, params = self._where(username, types, prefix="h.")
+        rows = self._connect().execute(
+            f"""SELECT h.*, bm25(history_fts) AS rank,
+                    snippet(history_fts, 0, '**', '**', '…', 16) AS input_snippet,
+                    snippet(history_fts, 1, '**', '**', '…', 24) AS output_snippet
+                FROM history_fts JOIN history h ON h.id = history_fts.rowid
+                WHERE history_fts MATCH ? AND {where}
+                ORDER BY rank LIMIT ?""",
+            [match] + params + [limit]
+        ).fetchall()
+        return [self._to_entry(row) for row in rows]
+
+    def type_counts(self, username, types=None, search=None):
+        """Return {type: count} for matching entries"""
+        where, params = self._where(username, types, search)
+        rows = self._connect().execute(
+            f"SELECT type, COUNT(*) FROM history WHERE {where} GROUP BY type", params
+        ).fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    def timeline(self, username, types=None, search=None, bucket_seconds=60):
+        """Return [(bucket_start_epoch, count)] for matching entries, oldest bucket first"""
+        where, params = self._where(username, types, search)
+        rows = self._connect().execute(
+            f"""SELECT CAST(created_at / ? AS INTEGER) * ? AS bucket, COUNT(*)
+                FROM history WHERE {where} GROUP BY bucket ORDER BY bucket""",
+            [bucket_seconds, bucket_seconds] + params
+        ).fetchall()
+        return [(row[0], row[1]) for row in rows]
+
+    def delete_user(self, username):
+        """Remove every entry belonging to username"""
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM history WHERE username = ?", (username,))
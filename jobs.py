@@ -0,0 +1,149 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Job states; "done", "failed" and "cancelled" are final
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+logger = logging.getLogger(__name__)
+
+class JobCancelled(Exception):
+    """Raised inside a job's callbacks once cancellation has been requested"""
+
+class Job:
+    """One background analysis: its inputs, live progress and final AnalysisResult"""
+
+    def __init__(self, username, analysis_type, history_type, history_input):
+        self.id = uuid.uuid4().hex
+        self.username = username
+        self.analysis_type = analysis_type
+        self.history_type = history_type
+        self.history_input = history_input
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.progress = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.recorded = False
+        self.future = None
+        self._tokens = []
+        self._cancel = threading.Event()
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    @property
+    def partial_text(self):
+        """Text streamed so far"""
+        return "".join(self._tokens)
+
+    def request_cancel(self):
+        """Ask the running job to stop at its next callback"""
+        self._cancel.set()
+
+    def on_token(self, token):
+        """Streaming callback; aborts the request once the job is cancelled"""
+        if self._cancel.is_set():
+            raise JobCancelled()
+        self._tokens.append(token)
+
+    def on_progress(self, done, total):
+        """Chunk progress callback; stops further chunks once the job is cancelled"""
+        if self._cancel.is_set():
+            raise JobCancelled()
+        self.progress = (done, total)
+
+class JobManager:
+    """Runs analysis jobs on a process-wide thread pool, independent of Streamlit script runs.
+
+    A rerun, widget interaction or page switch only stops the script that
+    submitted a job, not the job itself; sessions keep job ids and poll for
+    status. Finished jobs are forgotten after retention_seconds.
+    """
+
+    def __init__(self, max_workers=8, retention_seconds=3600):
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, run, username, analysis_type, history_type, history_input, on_done=None):
+        """Queue run(job) -> AnalysisResult and return the Job
+
+        on_done(job) is called from the worker thread once a job finishes with a result,
+        before the job is marked done. If it raises, the job is still done but keeps
+        the failure in job.error.
+        """
+        job = Job(username, analysis_type, history_type, history_input)
+
+        def work():
+            if job.cancel_requested:
+                job.status = CANCELLED
+                job.finished_at = time.time()
+                return
+            job.status = RUNNING
+            try:
+                job.result = run(job)
+            except JobCancelled:
+                pass
+            except Exception as e:
+                job.error = str(e)
+            job.finished_at = time.time()
+            if job.cancel_requested:
+                job.status = CANCELLED
+            elif job.result is None:
+                job.status = FAILED
+            else:
+                if on_done is not None:
+                    try:
+                        on_done(job)
+                    except Exception as e:
+                        logger.exception("on_done failed for job %s", job.id)
+                        job.error = str(e)
+                job.status = DONE
+
+        self.prune()
+        with self._lock:
+            self._jobs[job.id] = job
+        job.future = self._executor.submit(work)
+        return job
+
+    def get(self, job_id, username=None):
+        """Return the job with this id, or None if it is unknown or belongs to another user"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or (username is not None and job.username != username):
+            return None
+        return job
+
+    def cancel(self, job_id, username=None):
+        """Request cancellation; a queued job never starts and a streaming one stops at its next token"""
+        job = self.get(job_id, username)
+        if job is None or job.finished:
+            return False
+        job.request_cancel()
+        if job.future.cancel():
+            job.status = CANCELLED
+            job.finished_at = time.time()
+        return True
+
+    def prune(self, now=None):
+        """Forget finished jobs older than the retention period"""
+        cutoff = (now or time.time()) - self.retention_seconds
+        with self._lock:
+            for job_id in [job_id for job_id, job in self._jobs.items() if job.finished and job.finished_at < cutoff]:
+                del self._jobs[job_id]
+
+    def stats(self):
+        """Return counts of queued and running jobs"""
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {"queued": statuses.count(QUEUED), "running": statuses.count(RUNNING)}
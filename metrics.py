@@ -0,0 +1,148 @@
+import math
+import os
+import threading
+
+# Histogram upper bounds; the final +Inf bucket is implied
+LATENCY_BUCKETS_SECONDS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+PREFIX = "transformation_assistant"
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class _Histogram:
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = len(self.bounds)
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.total += value
+        self.count += 1
+
+class MetricsRegistry:
+    """In-process counters and histograms for API calls, exported in Prometheus text format.
+
+    Every process writes its own textfile (labelled with its pid) with an atomic
+    rename, so a node_exporter textfile collector or any local scraper can read
+    the directory at any time without seeing a partially written file.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._tokens = {}
+        self._input_tokens = {}
+        self._histograms = {}
+
+    def _histogram(self, name, labels, bounds):
+        key = (name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = _Histogram(bounds)
+        return histogram
+
+    def observe(self, analysis_type, result):
+        """Count one completed AnalysisResult"""
+        model = result.model or "unknown"
+        with self._lock:
+            key = (("type", analysis_type), ("status", result.status), ("model", model),
+                   ("route", result.route or ""), ("fallback", "true" if result.fallback else "false"),
+                   ("hedged", "true" if result.hedged else "false"),
+                   ("error_class", result.error_class or ""))
+            self._requests[key] = self._requests.get(key, 0) + 1
+            if result.preprocess is not None:
+                cleaned = result.preprocess
+                for stage, tokens in (("raw", cleaned.tokens_before), ("cleaned", cleaned.tokens_after)):
+                    input_labels = (("type", analysis_type), ("stage", stage))
+                    self._input_tokens[input_labels] = self._input_tokens.get(input_labels, 0) + tokens
+            if result.status == "cached":
+                return
+            labels = (("type", analysis_type), ("model", model))
+            self._histogram("request_latency_seconds", labels, LATENCY_BUCKETS_SECONDS).observe(
+                result.latency_ms / 1000
+            )
+            if result.ttft_ms is not None:
+                self._histogram("time_to_first_token_seconds", labels, LATENCY_BUCKETS_SECONDS).observe(
+                    result.ttft_ms / 1000
+                )
+            for kind, tokens in (("prompt", result.prompt_tokens), ("completion", result.completion_tokens)):
+                token_labels = labels + (("kind", kind),)
+                self._tokens[token_labels] = self._tokens.get(token_labels, 0) + tokens
+                self._histogram("tokens_per_request", token_labels, TOKEN_BUCKETS).observe(tokens)
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format"""
+        pid = (("pid", self.pid),)
+        lines = [
+            f"# HELP {PREFIX}_requests_total Analyses completed, by type, status, model, route, fallback, hedging and error class.",
+            f"# TYPE {PREFIX}_requests_total counter",
+        ]
+        with self._lock:
+            for labels, value in sorted(self._requests.items()):
+                lines.append(f"{PREFIX}_requests_total{_format_labels(pid + labels)} {value}")
+            lines += [
+                f"# HELP {PREFIX}_tokens_total Tokens consumed by API calls.",
+                f"# TYPE {PREFIX}_tokens_total counter",
+            ]
+            for labels, value in sorted(self._tokens.items()):
+                lines.append(f"{PREFIX}_tokens_total{_format_labels(pid + labels)} {value}")
+            lines += [
+                f"# HELP {PREFIX}_input_tokens_total Tokens of pasted input before and after pre-processing.",
+                f"# TYPE {PREFIX}_input_tokens_total counter",
+            ]
+            for labels, value in sorted(self._input_tokens.items()):
+                lines.append(f"{PREFIX}_input_tokens_total{_format_labels(pid + labels)} {value}")
+            helps = {
+                "request_latency_seconds": "Wall-clock duration of API calls.",
+                "time_to_first_token_seconds": "Delay before the first streamed token.",
+                "tokens_per_request": "Prompt and completion tokens per API call.",
+            }
+            for name, help_text in helps.items():
+                lines += [f"# HELP {PREFIX}_{name} {help_text}", f"# TYPE {PREFIX}_{name} histogram"]
+                for (metric, labels), histogram in sorted(self._histograms.items(), key=lambda item: item[0]):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.bounds + (math.inf,), histogram.counts):
+                        cumulative += count
+                        bucket_labels = _format_labels(pid + labels + (("le", _format_value(bound)),))
+                        lines.append(f"{PREFIX}_{name}_bucket{bucket_labels} {cumulative}")
+                    lines.append(f"{PREFIX}_{name}_sum{_format_labels(pid + labels)} {_format_value(histogram.total)}")
+                    lines.append(f"{PREFIX}_{name}_count{_format_labels(pid + labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path=None):
+        """Atomically replace the metrics textfile with the current values"""
+        path = path or self.path
+        if path is None:
+            return
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as handle:
+            handle.write(self.render())
+        os.replace(temp_path, path)
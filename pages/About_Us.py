@@ -52,6 +52,7 @@ with col2:
 - 📋 Change Management Guidance  
 - 👥 Team Analysis  
 - 💡 Strategic Recommendations  
+- 🚀 Run All (every analysis at once)  
 - 📜 Per-Session History  
 """)
 
@@ -67,9 +68,10 @@ st.markdown("""
 - No agency databases  
 - No ERP/HR systems  
 - No personal data scraping  
-- No permanent storage  
+- No external storage  
 
-All data lives only inside the current **Streamlit session memory**.
+Analysis history is kept per user in a local SQLite database on the application server,
+so it survives logout and can be deleted at any time with **Clear History** after confirming.
 """)
 
 st.caption("This page fulfils the 'About Us' documentation requirement.")
@@ -0,0 +1,94 @@
+import streamlit as st
+import time
+from datetime import datetime
+from analysis import get_usage_rollups
+from settings import get_setting
+
+# Require login
+if not st.session_state.get("authenticated", False):
+    st.warning("🔒 Please log in from the main page to access this content.")
+    st.stop()
+
+admin_users = [name.strip() for name in get_setting("ADMIN_USERS", "admin").split(",")]
+if st.session_state.get("username") not in admin_users:
+    st.warning("🔒 This dashboard is only available to administrators.")
+    st.stop()
+
+# Imported after the access checks so other users never load pandas
+import pandas as pd  # noqa: E402
+
+# Window label -> (rollup granularity, window length in seconds)
+WINDOWS = {
+    "Last hour (per minute)": ("minute", 3600),
+    "Last 24 hours (per hour)": ("hour", 24 * 3600),
+    "Last 7 days (per hour)": ("hour", 7 * 24 * 3600),
+    "Last 30 days (per day)": ("day", 30 * 24 * 3600),
+}
+
+st.title("🛡️ Organisation Usage Dashboard")
+st.markdown("Load across all users and worker processes, read from pre-aggregated usage rollups.")
+st.markdown("---")
+
+window = st.selectbox("Time window", list(WINDOWS))
+granularity, window_seconds = WINDOWS[window]
+since = time.time() - window_seconds
+
+rollups = get_usage_rollups()
+by_type = rollups.totals(granularity, since, group_by="type")
+
+if not by_type:
+    st.info("No analyses have been recorded in this window.")
+    st.stop()
+
+requests = sum(row["requests"] for row in by_type)
+errors = sum(row["errors"] for row in by_type)
+cached = sum(row["cached"] for row in by_type)
+latency_sum = sum(row["latency_ms_sum"] for row in by_type)
+prompt_tokens = sum(row["prompt_tokens"] for row in by_type)
+completion_tokens = sum(row["completion_tokens"] for row in by_type)
+
+c1, c2, c3, c4, c5 = st.columns(5)
+with c1:
+    st.metric("Analyses", f"{requests:,}")
+with c2:
+    st.metric("Error Rate", f"{errors / requests:.1%}")
+with c3:
+    st.metric("Cache Hit Rate", f"{cached / requests:.1%}")
+with c4:
+    st.metric("Avg Latency", f"{latency_sum / requests / 1000:.1f} s")
+with c5:
+    st.metric("Tokens (In / Out)", f"{prompt_tokens:,} / {completion_tokens:,}")
+
+st.markdown("---")
+st.subheader("Analyses Over Time")
+
+series = pd.DataFrame(rollups.series(granularity, since))
+series["time"] = series["bucket_start"].map(datetime.fromtimestamp)
+st.bar_chart(
+    series.pivot_table(index="time", columns="type", values="requests", aggfunc="sum", fill_value=0),
+    use_container_width=True,
+)
+
+st.markdown("---")
+
+def summary_table(rows, key_label):
+    """Turn rollup totals into a display table"""
+    table = pd.DataFrame(rows)
+    table["avg_latency_s"] = (table["latency_ms_sum"] / table["requests"] / 1000).round(2)
+    table["max_latency_s"] = (table["latency_ms_max"] / 1000).round(2)
+    return table.rename(columns={"key": key_label})[
+        [key_label, "requests", "errors", "cached", "avg_latency_s", "max_latency_s",
+         "prompt_tokens", "completion_tokens"]
+    ]
+
+col1, col2 = st.columns(2)
+with col1:
+    st.subheader("By Analysis Type")
+    st.dataframe(summary_table(by_type, "type"), use_container_width=True, hide_index=True)
+with col2:
+    st.subheader("By User")
+    st.dataframe(
+        summary_table(rollups.totals(granularity, since, group_by="username"), "user"),
+        use_container_width=True,
+        hide_index=True,
+    )
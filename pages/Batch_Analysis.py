@@ -0,0 +1,185 @@
+import streamlit as st
+import asyncio
+import csv
+import io
+import json
+import time
+from analysis import (
+    ANALYSIS_TYPE_LABELS,
+    FRAMEWORKS,
+    URGENCY_LEVELS,
+    analyze_batch,
+    persist_analysis,
+    record_analysis
+)
+from settings import get_setting
+
+# Require login
+if not st.session_state.get("authenticated", False):
+    st.warning("🔒 Please log in from the main page to access this content.")
+    st.stop()
+
+TYPE_ALIASES = {label.lower(): key for key, label in ANALYSIS_TYPE_LABELS.items()}
+TYPE_ALIASES.update({key: key for key in ANALYSIS_TYPE_LABELS})
+
+def parse_batch_file(uploaded_file):
+    """Parse an uploaded CSV, JSONL or JSON file into validated batch rows and a list of problems"""
+    text = uploaded_file.getvalue().decode("utf-8-sig")
+    name = uploaded_file.name.lower()
+    invalid = {}  # row number -> JSON error of a JSONL line
+    if name.endswith(".csv"):
+        records = list(csv.DictReader(io.StringIO(text)))
+    elif name.endswith(".json"):
+        try:
+            records = json.loads(text)
+        except json.JSONDecodeError as e:
+            return [], [f"Invalid JSON (line {e.lineno}: {e.msg})"]
+        if not isinstance(records, list):
+            return [], ["A JSON file must contain a list of rows"]
+    else:
+        records = []
+        for line_no, line in enumerate(text.splitlines(), start=1):
+            if line.strip():
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError as e:
+                    records.append(None)
+                    invalid[len(records)] = f"line {line_no}: {e.msg}"
+
+    rows, problems = [], []
+    for number, record in enumerate(records, start=1):
+        if number in invalid:
+            problems.append(f"Row {number}: invalid JSON ({invalid[number]})")
+            continue
+        if not isinstance(record, dict):
+            problems.append(f"Row {number}: expected an object with input and analysis_type")
+            continue
+        user_input = str(record.get("input") or "").strip()
+        analysis_type = TYPE_ALIASES.get(str(record.get("analysis_type") or "").strip().lower())
+        framework = str(record.get("framework") or "").strip() or None
+        urgency = str(record.get("urgency") or "").strip().capitalize() or None
+        if not user_input:
+            problems.append(f"Row {number}: missing input")
+        elif not analysis_type:
+            problems.append(f"Row {number}: unknown analysis_type {record.get('analysis_type')!r}")
+        elif framework and framework not in FRAMEWORKS:
+            problems.append(f"Row {number}: unknown framework {framework!r}")
+        elif urgency and urgency not in URGENCY_LEVELS:
+            problems.append(f"Row {number}: unknown urgency {urgency!r}")
+        else:
+            rows.append({
+                "row": number,
+                "input": user_input,
+                "analysis_type": analysis_type,
+                "framework": framework,
+                "urgency": urgency
+            })
+    return rows, problems
+
+def results_to_csv(results):
+    """Serialise batch results as CSV text"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=["row", "analysis_type", "framework", "urgency", "input", "output"])
+    writer.writeheader()
+    writer.writerows(results)
+    return buffer.getvalue()
+
+def results_to_jsonl(results):
+    """Serialise batch results as JSON Lines text"""
+    return "".join(json.dumps(result, ensure_ascii=False) + "\n" for result in results)
+
+st.title("📦 Batch Analysis")
+st.markdown(
+    "Run many analyses at once from a CSV, JSONL or JSON file (a list of rows). Each row needs an `input` and an "
+    "`analysis_type` (Risk Detection, Change Guidance, Team Analysis or Recommendations); "
+    "`framework` and `urgency` are optional."
+)
+st.markdown("---")
+
+if not st.session_state.get("openai_api_key"):
+    st.error("Please configure your OpenAI API key in Streamlit Cloud secrets.")
+    st.stop()
+
+uploaded_file = st.file_uploader("Upload inputs", type=["csv", "jsonl", "json"])
+
+col1, col2 = st.columns(2)
+with col1:
+    concurrency = st.slider(
+        "Concurrent requests",
+        min_value=1,
+        max_value=16,
+        value=get_setting("BATCH_CONCURRENCY", 4)
+    )
+with col2:
+    use_cache = st.checkbox("Reuse cached answers", value=True)
+
+if uploaded_file is not None:
+    rows, problems = parse_batch_file(uploaded_file)
+    if problems:
+        with st.expander(f"⚠️ {len(problems)} row(s) skipped"):
+            st.markdown("\n".join(f"- {problem}" for problem in problems))
+    st.caption(f"{len(rows)} row(s) ready to analyse")
+
+    if st.button("Run Batch", disabled=not rows):
+        progress = st.progress(0.0, text="Starting batch...")
+        completed = [0]
+        finished_at = {}
+
+        def on_result(index, result):
+            # Persist as each row finishes so a rerun mid-batch keeps what was already paid for
+            row = rows[index]
+            finished_at[index] = time.time()
+            persist_analysis(
+                st.session_state.username, ANALYSIS_TYPE_LABELS[row["analysis_type"]], row["input"], result,
+                finished_at[index]
+            )
+            completed[0] += 1
+            progress.progress(completed[0] / len(rows), text=f"Completed {completed[0]} of {len(rows)}")
+
+        analysis_results = asyncio.run(
+            analyze_batch(
+                st.session_state.openai_api_key,
+                rows,
+                concurrency=concurrency,
+                use_cache=use_cache,
+                on_result=on_result
+            )
+        )
+
+        results = []
+        for index, (row, result) in enumerate(zip(rows, analysis_results)):
+            record_analysis(
+                ANALYSIS_TYPE_LABELS[row["analysis_type"]], row["input"], result,
+                created_at=finished_at.get(index), persist=False
+            )
+            results.append({**row, "output": result.text})
+        st.session_state.batch_results = results
+        st.success(f"Batch complete: {len(results)} analyses added to your history.")
+
+results = st.session_state.get("batch_results")
+if results:
+    st.markdown("---")
+    st.subheader("Results")
+    col_a, col_b = st.columns(2)
+    with col_a:
+        st.download_button(
+            "Download CSV",
+            data=results_to_csv(results),
+            file_name="batch_results.csv",
+            mime="text/csv",
+            use_container_width=True
+        )
+    with col_b:
+        st.download_button(
+            "Download JSONL",
+            data=results_to_jsonl(results),
+            file_name="batch_results.jsonl",
+            mime="application/jsonl",
+            use_container_width=True
+        )
+    for result in results:
+        with st.expander(f"Row {result['row']} - {ANALYSIS_TYPE_LABELS[result['analysis_type']]}"):
+            st.markdown("**Input:**")
+            st.text(result["input"][:200] + "..." if len(result["input"]) > 200 else result["input"])
+            st.markdown("**Analysis:**")
+            st.markdown(result["output"])
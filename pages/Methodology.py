@@ -10,7 +10,7 @@ st.markdown("---")
 
 st.subheader("1. Design Principles")
 st.markdown("""
-1. **Privacy by design** — all data is pasted manually and stays local to the session  
+1. **Privacy by design** — all data is pasted manually and stays on the application server  
 2. **Explainability** — outputs focus on clarity, actionability, and frameworks  
 3. **Safety** — restricted system prompts, no tool execution, no system access  
 4. **Simplicity** — clean UI with four core analysis modules  
@@ -26,13 +26,17 @@ with col1:
 - Python
 - OpenAI API (LLM)
 - `st.session_state` for temporary state
+- SQLite for persistent analysis history
 """)
 
 with col2:
     st.markdown("""
 ### Application Structure
-- `app.py` → Login + main 4-tab interface  
+- `app.py` → Login + main interface (4 analysis tabs + Run All)  
+- `analysis.py` → System prompts, OpenAI client & analysis calls  
 - `pages/About_Us.py` → Scope & goals  
+- `pages/Batch_Analysis.py` → Concurrent analysis of uploaded files  
+- `pages/Admin_Dashboard.py` → Organisation-wide usage (administrators only)  
 - `pages/Methodology.py` → Architecture & methodology  
 - `pages/Usage_Analytics.py` → Query history visualisation  
 """)
@@ -56,7 +60,7 @@ st.markdown("""
 4. App selects `risk_detection` system prompt  
 5. Sends request to OpenAI  
 6. Receives risk insights + early warning signals  
-7. Displays results and logs them to session history  
+7. Displays results and logs them to the persistent history  
 """)
 
 st.markdown("### Use Case 2 — Change Guidance")
@@ -86,7 +90,7 @@ st.subheader("5. Safeguards & Security")
 st.markdown("""
 - Login system with SHA-256 hashed passwords  
 - OpenAI API key stored in Streamlit Secrets  
-- No data stored on disk or external systems  
+- Analysis history is stored only in a SQLite database on the application server, never in external systems  
 - No tool execution, file access, or code execution in prompts  
 - Basic error handling for API failures, rate limits, quota issues  
 """)
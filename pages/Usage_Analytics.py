@@ -1,11 +1,18 @@
 import streamlit as st
-import pandas as pd
-from collections import Counter
+from datetime import datetime
+import os
+import uuid
+from analysis import get_analytics_frame, get_history_store
+from history_export import EXPORT_FORMATS, export_history, prune_exports
+from settings import data_path, get_setting
 
 if not st.session_state.get("authenticated", False):
     st.warning("🔒 Please log in from the main page.")
     st.stop()
 
+# Imported after the login check so visitors who are not signed in never load pandas
+import pandas as pd  # noqa: E402
+
 st.title("📊 Usage & Query Analytics")
 st.write("Visualisation will go here.")
 
@@ -18,32 +25,30 @@ st.title("📊 Usage & Query Analytics")
 st.markdown(
     """
 This page gives an overview of how the **Transformation Management Assistant** 
-is being used in the current session.
+has been used from your account, across all sessions.
 """
 )
 st.markdown("---")
 
-chat_history = st.session_state.get("chat_history", [])
+store = get_history_store()
+username = st.session_state.get("username")
 
-if not chat_history:
-    st.info("No analyses have been run in this session yet. Try running a few queries first.")
-    st.stop()
+# Columnar view of the history; only entries recorded since the last rerun are fetched. The frame is
+# shared with the user's other sessions, so this page queries the snapshot taken by this sync
+frame = get_analytics_frame(username).sync(store, username)
 
-# Turn history into a DataFrame
-df = pd.DataFrame(chat_history)
+if not len(frame):
+    st.info("No analyses have been run yet. Try running a few queries first.")
+    st.stop()
 
-# Ensure columns exist
-expected_cols = ["timestamp", "type", "input", "output"]
-for col in expected_cols:
-    if col not in df.columns:
-        df[col] = None
+all_type_counts = frame.type_counts()
 
 # Filters
 st.subheader("1. Filters")
 col1, col2 = st.columns(2)
 
 with col1:
-    types_available = sorted(df["type"].dropna().unique())
+    types_available = sorted(all_type_counts)
     selected_types = st.multiselect(
         "Filter by analysis type",
         options=types_available,
@@ -52,92 +57,189 @@ with col1:
 
 with col2:
     search_term = st.text_input(
-        "Search within input text (optional)",
-        placeholder="e.g. resistance, finance, stakeholder"
+        "Search inputs and analyses (optional)",
+        placeholder="e.g. resistance, finance, stakeholder",
+        help='Words match as prefixes (e.g. "stake" finds "stakeholders"); use quotes for exact phrases.'
     )
 
-# Apply filters
-filtered_df = df[df["type"].isin(selected_types)]
+# Type filters are applied to the columnar frame; text search is resolved by the store
+matching_ids = store.matching_ids(username, search_term) if search_term else None
+filtered_mask = frame.mask(types=selected_types, ids=matching_ids)
+filtered_type_counts = frame.type_counts(filtered_mask)
+filtered_count = int(filtered_mask.sum())
 
 if search_term:
-    search_term_lower = search_term.lower()
-    filtered_df = filtered_df[
-        filtered_df["input"].astype(str).str.lower().str.contains(search_term_lower)
-        | filtered_df["output"].astype(str).str.lower().str.contains(search_term_lower)
-    ]
+    top_matches = store.search(username, search_term, types=selected_types, limit=10)
+    with st.expander(f"🔎 Top matches for \"{search_term}\" ({filtered_count} total)", expanded=True):
+        if not top_matches:
+            st.caption("No analyses match this search.")
+        for match in top_matches:
+            st.markdown(f"**{match['type']} - {match['timestamp']}**")
+            st.markdown(f"> {match['input_snippet']}")
+            st.caption(match["output_snippet"])
 
 st.markdown("---")
 
 # Summary stats
 st.subheader("2. Summary Statistics")
 
-c1, c2, c3 = st.columns(3)
+c1, c2, c3, c4 = st.columns(4)
 
 with c1:
-    st.metric("Total Analyses (Session)", len(df))
+    st.metric("Total Analyses (All Sessions)", len(frame))
 
 with c2:
-    st.metric("Analyses (After Filters)", len(filtered_df))
+    st.metric("Analyses (After Filters)", filtered_count)
 
 with c3:
-    type_counts = Counter(df["type"])
-    most_common_type, most_common_count = type_counts.most_common(1)[0]
-    st.metric("Most Used Analysis Type", f"{most_common_type} ({most_common_count})")
+    most_common_type = max(all_type_counts, key=all_type_counts.get)
+    st.metric("Most Used Analysis Type", f"{most_common_type} ({all_type_counts[most_common_type]})")
+
+with c4:
+    st.metric("Avg Input Length (After Filters)", f"{frame.mean_input_length(filtered_mask):,.0f} chars")
 
 st.markdown("---")
 
 # Visual: counts by type
 st.subheader("3. Analyses by Type")
 
-count_by_type = (
-    filtered_df.groupby("type")
-    .size()
-    .reset_index(name="count")
-    .sort_values("count", ascending=False)
-)
-
-st.bar_chart(
-    data=count_by_type.set_index("type")["count"],
-    use_container_width=True,
-)
+if filtered_type_counts:
+    count_by_type = pd.Series(filtered_type_counts, name="count").sort_values(ascending=False)
+    st.bar_chart(
+        data=count_by_type,
+        use_container_width=True,
+    )
+else:
+    st.info("No analyses match the current filters.")
 
 st.markdown("---")
 
 # Visual: timeline
-st.subheader("4. Timeline of Analyses (Current Session)")
-
-# Convert timestamp to datetime if possible
-try:
-    filtered_df["timestamp_dt"] = pd.to_datetime(filtered_df["timestamp"])
-    timeline_df = (
-        filtered_df.sort_values("timestamp_dt")
-        .groupby(filtered_df["timestamp_dt"].dt.floor("min"))
-        .size()
-        .reset_index(name="count")
-        .rename(columns={"timestamp_dt": "time"})
+st.subheader("4. Timeline of Analyses")
+
+buckets, bucket_counts = frame.timeline(filtered_mask, bucket_seconds=60)
+if len(buckets):
+    timeline_df = pd.DataFrame(
+        {
+            "time": [datetime.fromtimestamp(bucket) for bucket in buckets.tolist()],
+            "count": bucket_counts,
+        }
     )
-
     st.line_chart(
         data=timeline_df.set_index("time")["count"],
         use_container_width=True,
     )
-except Exception:
-    st.info("Timestamp format could not be parsed into a timeline. Using raw table instead.")
+
+st.markdown("---")
+
+# Latency and token usage of API calls (cache hits excluded)
+st.subheader("5. Latency & Token Usage")
+
+latency_rows = []
+for entry_type in sorted(filtered_type_counts):
+    type_mask = filtered_mask & frame.mask(types=[entry_type])
+    latency = frame.percentiles("latency_ms", type_mask)
+    ttft = frame.percentiles("ttft_ms", type_mask)
+    if latency:
+        latency_rows.append({
+            "type": entry_type,
+            "p50_s": round(latency[50] / 1000, 2),
+            "p95_s": round(latency[95] / 1000, 2),
+            "p99_s": round(latency[99] / 1000, 2),
+            "ttft_p50_s": round(ttft[50] / 1000, 2) if ttft else None,
+            "ttft_p95_s": round(ttft[95] / 1000, 2) if ttft else None,
+            "avg_prompt_tokens": round(float(frame.prompt_tokens[type_mask & ~frame.cached].mean()), 1),
+            "avg_completion_tokens": round(float(frame.completion_tokens[type_mask & ~frame.cached].mean()), 1),
+        })
+
+if latency_rows:
+    st.dataframe(pd.DataFrame(latency_rows), use_container_width=True, hide_index=True)
+    col_prompt, col_completion = st.columns(2)
+    for column, label, container in (
+        ("prompt_tokens", "Prompt tokens per call", col_prompt),
+        ("completion_tokens", "Completion tokens per call", col_completion),
+    ):
+        edges, counts = frame.token_histogram(column, filtered_mask)
+        with container:
+            st.markdown(f"**{label}**")
+            if counts.sum():
+                st.bar_chart(
+                    pd.Series(counts, index=pd.Index(edges[:-1].round().astype(int), name="tokens"), name="calls"),
+                    use_container_width=True,
+                )
+            else:
+                st.caption("No token usage recorded yet.")
+else:
+    st.info("No timed API calls match the current filters yet.")
 
 st.markdown("---")
 
 # Table of queries
-st.subheader("5. Detailed Query Log (Current Session)")
+st.subheader("6. Detailed Query Log")
+
+detail_limit = get_setting("ANALYTICS_DETAIL_ROWS", 500)
+detail_rows = store.page(username, limit=detail_limit, types=selected_types, search=search_term)
 
 st.dataframe(
-    filtered_df[["timestamp", "type", "input", "output"]],
+    pd.DataFrame(
+        detail_rows,
+        columns=["timestamp", "type", "input", "output", "status", "latency_ms", "prompt_tokens",
+                 "completion_tokens", "model", "route"],
+    ),
     use_container_width=True,
     height=400,
 )
 
 st.caption(
-    "This view is based only on the current Streamlit session. "
-    "Data is not persisted once the session ends."
+    "This view covers every analysis recorded for your account. "
+    f"The detailed log shows the {min(detail_limit, filtered_count)} most recent matching entries."
 )
 
+st.markdown("---")
 
+# Export of the filtered history, written to disk in chunks rather than built as one DataFrame.
+# st.download_button holds the whole file in memory while it is offered, so its size is capped
+st.subheader("7. Export")
+max_download_bytes = get_setting("EXPORT_DOWNLOAD_MAX_BYTES", 100_000_000)
+
+col_format, col_prepare = st.columns([3, 1])
+with col_format:
+    export_format = st.radio("Format", list(EXPORT_FORMATS), horizontal=True)
+with col_prepare:
+    prepare_export = st.button("Prepare export", use_container_width=True)
+
+if prepare_export:
+    extension, _ = EXPORT_FORMATS[export_format]
+    previous = st.session_state.get("history_export")
+    if previous and os.path.exists(previous["path"]):
+        os.remove(previous["path"])
+    export_dir = data_path("exports")
+    os.makedirs(export_dir, exist_ok=True)
+    prune_exports(export_dir)
+    path = os.path.join(export_dir, f"{uuid.uuid4().hex}.{extension}")
+    with st.spinner(f"Exporting {filtered_count:,} analyses..."):
+        exported = export_history(
+            store, username, path, export_format, types=selected_types, search=search_term or None,
+            chunk_rows=get_setting("EXPORT_CHUNK_ROWS", 1000)
+        )
+    size = os.path.getsize(path)
+    if size > max_download_bytes:
+        os.remove(path)
+        st.session_state.history_export = None
+        st.warning(
+            f"This export is {size / 1e6:,.0f} MB, over the {max_download_bytes / 1e6:,.0f} MB download limit. "
+            "Narrow it down with the type filter or a search and prepare it again."
+        )
+    else:
+        st.session_state.history_export = {"path": path, "format": export_format, "count": exported}
+
+history_export = st.session_state.get("history_export")
+if history_export and os.path.exists(history_export["path"]):
+    extension, mime = EXPORT_FORMATS[history_export["format"]]
+    with open(history_export["path"], "rb") as handle:
+        st.download_button(
+            f"Download {history_export['count']:,} analyses ({history_export['format']})",
+            data=handle,
+            file_name=f"analysis_history.{extension}",
+            mime=mime,
+        )
@@ -0,0 +1,216 @@
+import re
+from dataclasses import dataclass, field
+from tokens import count_tokens
+
+# "On Mon, 3 Jun 2024 at 10:12, Jane Doe <jane@example.com> wrote:" and its translations
+ATTRIBUTION_RE = re.compile(r"^(on\b.{0,200}\bwrote|le\b.{0,200}\ba écrit|am\b.{0,200}\bschrieb)\s*:\s*$", re.I)
+# Outlook-style separators that start a forwarded or quoted message
+SEPARATOR_RE = re.compile(r"^-{2,}\s*(original message|forwarded message)\s*-{2,}$|^_{10,}$", re.I)
+HEADER_RE = re.compile(r"^(from|sent|date|to|cc|bcc|subject|reply-to|importance)\s*:", re.I)
+SIGN_OFF_RE = re.compile(
+    r"^(best|kind|warm)?\s*(regards|wishes)[,!.]?$|^(many\s+)?thanks[,!.]?$|^thank you[,!.]?$|^cheers[,!.]?$"
+    r"|^(best|all the best|sincerely|yours sincerely|br)[,!.]?$",
+    re.I
+)
+DEVICE_FOOTER_RE = re.compile(r"^(sent from my|get outlook for)\b", re.I)
+# The line after a sign-off must look like a name ("Bob", "Jane Doe", "J. Smith") to start a signature
+NAME_RE = re.compile(r"^[A-Z][\w'.-]*(\s+[A-Z][\w'.-]*){0,3},?$")
+DISCLAIMER_RE = re.compile(
+    r"^(confidentiality notice|disclaimer\b|this (e-?mail|message)\b.{0,80}\b(confidential|intended (solely )?for)"
+    r"|please consider the environment before printing)",
+    re.I
+)
+# Chat-export prefixes, whose time is ignored when looking for near-duplicates: "[10:32]", "2024-06-03 10:32",
+# "10:32 AM -"
+TIMESTAMP_PREFIX_RE = re.compile(
+    r"^\s*(\[[^\]]{1,40}\]|\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4},?(\s+\d{1,2}:\d{2}(:\d{2})?(\s*[ap]\.?m\.?)?)?"
+    r"|\d{1,2}:\d{2}(:\d{2})?(\s*[ap]\.?m\.?)?)\s*[-–:,]?\s*",
+    re.I
+)
+DATE_RE = re.compile(r"\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}")
+EMAIL_RE = re.compile(r"\b[\w.+-]+@[\w-]+(\.[\w-]+)+\b")
+PHONE_RE = re.compile(r"(?<![\w/])\+?\d[\d ().-]{7,}\d(?!\w)")
+
+@dataclass
+class PreprocessOptions:
+    """Which clean-up stages run; each can be switched off per setting"""
+    strip_quotes: bool = True
+    strip_signatures: bool = True
+    strip_disclaimers: bool = True
+    dedupe: bool = True
+    near_duplicates: bool = True
+    compact_whitespace: bool = True
+    mask_pii: bool = False
+    min_dedupe_chars: int = 12  # shorter lines ("Yes", "Agreed") are answers, not duplicates
+    max_signature_lines: int = 6
+
+@dataclass
+class PreprocessResult:
+    """Cleaned text with its token count before and after, and lines removed per stage"""
+    text: str
+    tokens_before: int
+    tokens_after: int
+    removed: dict = field(default_factory=dict)
+
+    @property
+    def saved_share(self):
+        return 1 - self.tokens_after / self.tokens_before if self.tokens_before else 0.0
+
+def _drop(removed, stage):
+    removed[stage] = removed.get(stage, 0) + 1
+
+def _strip_quotes(lines, removed):
+    in_headers = False
+    for line in lines:
+        stripped = line.strip()
+        if stripped.startswith(">") or ATTRIBUTION_RE.match(stripped):
+            _drop(removed, "quotes")
+            continue
+        if SEPARATOR_RE.match(stripped):
+            in_headers = True
+            _drop(removed, "quotes")
+            continue
+        if in_headers:
+            # The header block of a quoted message ends at its first blank or non-header line
+            if HEADER_RE.match(stripped):
+                _drop(removed, "quotes")
+                continue
+            in_headers = False
+        yield line
+
+def _is_boundary(stripped):
+    """Whether a line ends the message above it: a quote, a forwarded message or a disclaimer"""
+    return (stripped.startswith(">") or bool(ATTRIBUTION_RE.match(stripped)) or bool(SEPARATOR_RE.match(stripped))
+            or bool(HEADER_RE.match(stripped)) or bool(DISCLAIMER_RE.match(stripped)))
+
+def _continues_signature(signature, stripped, max_lines):
+    """Whether a line directly below the signature lines so far can belong to it"""
+    if len(signature) >= max_lines or len(stripped) > 80 or stripped.endswith((".", "?", "!")):
+        return False
+    if TIMESTAMP_PREFIX_RE.match(stripped):
+        return False
+    # The first line after a sign-off is the sender's name; a "-- " delimiter needs no name
+    return len(signature) > 1 or not SIGN_OFF_RE.match(signature[0].strip()) or bool(NAME_RE.match(stripped))
+
+def _strip_signatures(lines, removed, max_lines):
+    # A signature is a sign-off (or "-- " delimiter) after some body text, followed by a name and up
+    # to max_lines short lines, and nothing else before a quote, separator, disclaimer or the end of
+    # input. Anything else ("Thanks." followed by more text, or a chat's "Thanks!") is ordinary text
+    pending, body_seen, after_blank = None, False, False
+    for line in lines:
+        stripped = line.strip()
+        if pending is not None:
+            signature = [entry for entry in pending if entry.strip()]
+            if not stripped:
+                pending.append(line)
+                after_blank = True
+                continue
+            if _is_boundary(stripped) or DEVICE_FOOTER_RE.match(stripped):
+                removed["signatures"] = removed.get("signatures", 0) + len(signature)
+                yield from (entry for entry in pending if not entry.strip())
+                pending = None
+            elif not after_blank and _continues_signature(signature, stripped, max_lines):
+                pending.append(line)
+                continue
+            else:
+                yield from pending
+                pending = None
+        if DEVICE_FOOTER_RE.match(stripped):
+            _drop(removed, "signatures")
+            continue
+        if body_seen and (line.rstrip() in ("--", "-- ") or SIGN_OFF_RE.match(stripped)):
+            pending, after_blank = [line], False
+            continue
+        if stripped and not _is_boundary(stripped):
+            body_seen = True
+        yield line
+    if pending is not None:
+        removed["signatures"] = removed.get("signatures", 0) + sum(1 for entry in pending if entry.strip())
+        yield from (entry for entry in pending if not entry.strip())
+
+def _strip_disclaimers(lines, removed):
+    in_disclaimer = False
+    for line in lines:
+        stripped = line.strip()
+        if in_disclaimer and stripped:
+            _drop(removed, "disclaimers")
+            continue
+        in_disclaimer = bool(DISCLAIMER_RE.match(stripped))
+        if in_disclaimer:
+            _drop(removed, "disclaimers")
+            continue
+        yield line
+
+def _dedupe_key(line, near):
+    if near:
+        # Copies of a chat message differ in the time they were posted, not in the day they refer to
+        prefix = TIMESTAMP_PREFIX_RE.match(line)
+        if prefix:
+            line = " ".join(DATE_RE.findall(prefix.group())) + " " + line[prefix.end():]
+        return " ".join(re.findall(r"\w+", line.casefold()))
+    return " ".join(line.split())
+
+def _dedupe(lines, removed, near, min_chars):
+    seen = set()
+    for line in lines:
+        key = _dedupe_key(line, near)
+        if len(key) >= min_chars:
+            if key in seen:
+                _drop(removed, "duplicates")
+                continue
+            seen.add(key)
+        yield line
+
+def _compact_whitespace(lines):
+    # Collapse runs of spaces and of blank lines; leading and trailing blank lines are dropped
+    blank, started = False, False
+    for line in lines:
+        line = " ".join(line.split())
+        if not line:
+            blank = True
+            continue
+        if blank and started:
+            yield ""
+        blank, started = False, True
+        yield line
+
+def _mask_pii(lines):
+    for line in lines:
+        yield PHONE_RE.sub("[phone]", EMAIL_RE.sub("[email]", line))
+
+def iter_clean_lines(lines, options=None, removed=None):
+    """Lazily clean an iterable of lines from pasted emails or chat exports
+
+    Stages run as a generator pipeline in order: signatures (first, so quoted
+    replies still mark where a message ends), quoted replies, disclaimers,
+    duplicate lines, whitespace and finally PII masking, so input is processed
+    line by line without being held in memory. Lines dropped by each stage are
+    counted in removed when a dict is passed.
+    """
+    options = options or PreprocessOptions()
+    removed = {} if removed is None else removed
+    lines = (line.rstrip("\r\n") for line in lines)
+    if options.strip_signatures:
+        lines = _strip_signatures(lines, removed, options.max_signature_lines)
+    if options.strip_quotes:
+        lines = _strip_quotes(lines, removed)
+    if options.strip_disclaimers:
+        lines = _strip_disclaimers(lines, removed)
+    if options.dedupe:
+        lines = _dedupe(lines, removed, options.near_duplicates, options.min_dedupe_chars)
+    if options.compact_whitespace:
+        lines = _compact_whitespace(lines)
+    if options.mask_pii:
+        lines = _mask_pii(lines)
+    return lines
+
+def preprocess_text(text, options=None):
+    """Clean pasted communications and report the prompt tokens saved
+
+    If cleaning would remove everything, the original text is kept.
+    """
+    removed = {}
+    cleaned = "\n".join(iter_clean_lines(text.splitlines(), options, removed)).strip()
+    if not cleaned:
+        cleaned, removed = text, {}
+    return PreprocessResult(cleaned, count_tokens(text), count_tokens(cleaned), removed)
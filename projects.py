@@ -0,0 +1,90 @@
+import sqlite3
+import time
+from db import ThreadLocalConnection
+
+def extract_delta(previous_log, current_log):
+    """Return the part of a cumulative project log that is new since previous_log
+
+    Logs usually grow by appending, in which case the delta is the appended text.
+    If earlier entries were edited or reordered, every line that did not appear in
+    the previous log is kept, in order.
+    """
+    if not previous_log:
+        return current_log.strip()
+    if current_log.startswith(previous_log):
+        return current_log[len(previous_log):].strip()
+    seen = {line.strip() for line in previous_log.splitlines()}
+    return "\n".join(line for line in current_log.splitlines() if line.strip() and line.strip() not in seen)
+
+class ProjectStore:
+    """SQLite store of named projects with a rolling summary and token accounting, keyed by username.
+
+    For each project the last submitted log is kept so the next submission can be
+    reduced to what changed, together with prompt token totals for what was sent
+    and what sending the whole log each time would have cost.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._db = ThreadLocalConnection(path, row_factory=sqlite3.Row)
+        self._init_db()
+
+    def _connect(self):
+        return self._db.get()
+
+    def _init_db(self):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS projects (
+                    username TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    summary TEXT NOT NULL DEFAULT '',
+                    last_log TEXT NOT NULL DEFAULT '',
+                    submissions INTEGER NOT NULL DEFAULT 0,
+                    full_prompt_tokens INTEGER NOT NULL DEFAULT 0,
+                    sent_prompt_tokens INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (username, name)
+                )"""
+            )
+
+    def names(self, username):
+        """Return the user's project names, most recently updated first"""
+        rows = self._connect().execute(
+            "SELECT name FROM projects WHERE username = ? ORDER BY updated_at DESC", (username,)
+        ).fetchall()
+        return [row["name"] for row in rows]
+
+    def get(self, username, name):
+        """Return the project as a dict, or None if it does not exist yet"""
+        row = self._connect().execute(
+            "SELECT * FROM projects WHERE username = ? AND name = ?", (username, name)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def record(self, username, name, summary, last_log, full_prompt_tokens, sent_prompt_tokens):
+        """Store a submission's new summary and log and add its prompt tokens to the totals"""
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                """INSERT INTO projects (username, name, summary, last_log, submissions,
+                        full_prompt_tokens, sent_prompt_tokens, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, 1, ?, ?, ?, ?)
+                    ON CONFLICT (username, name) DO UPDATE SET
+                        summary = excluded.summary,
+                        last_log = excluded.last_log,
+                        submissions = submissions + 1,
+                        full_prompt_tokens = full_prompt_tokens + excluded.full_prompt_tokens,
+                        sent_prompt_tokens = sent_prompt_tokens + excluded.sent_prompt_tokens,
+                        updated_at = excluded.updated_at""",
+                (username, name, summary, last_log, full_prompt_tokens, sent_prompt_tokens, now, now)
+            )
+
+def token_savings(project):
+    """Return (tokens saved, share of the full-log cost saved) for a project dict"""
+    saved = project["full_prompt_tokens"] - project["sent_prompt_tokens"]
+    share = saved / project["full_prompt_tokens"] if project["full_prompt_tokens"] else 0.0
+    return saved, share
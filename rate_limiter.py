@@ -0,0 +1,184 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+class RateLimitTimeout(Exception):
+    """Raised when a request cannot be admitted by the limiter within its timeout"""
+
+class RateLimiter:
+    """Process-wide client-side limiter for the OpenAI API.
+
+    Admission requires a request token and enough completion-token budget from two
+    token buckets (refilled continuously from requests/min and tokens/min quotas),
+    a free concurrency slot, and no active Retry-After pause. The concurrency limit
+    follows AIMD: it grows by roughly one slot per window of successful calls and
+    halves on every 429. Priority waiters are always admitted before normal ones.
+    """
+
+    def __init__(self, requests_per_minute=500, tokens_per_minute=40000,
+                 max_concurrency=16, min_concurrency=1):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.concurrency_limit = float(max_concurrency)
+        self._request_budget = float(requests_per_minute)
+        self._token_budget = float(tokens_per_minute)
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._in_flight = 0
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self.rate_limited_count = 0
+
+    def _refill(self, now):
+        elapsed = now - self._refilled_at
+        self._refilled_at = now
+        self._request_budget = min(
+            float(self.requests_per_minute),
+            self._request_budget + elapsed * self.requests_per_minute / 60.0
+        )
+        self._token_budget = min(
+            float(self.tokens_per_minute),
+            self._token_budget + elapsed * self.tokens_per_minute / 60.0
+        )
+
+    def _wait_time(self, tokens, now):
+        """Seconds until the head waiter could be admitted, or 0 if it can go now"""
+        waits = [self._paused_until - now]
+        if self._request_budget < 1:
+            waits.append((1 - self._request_budget) * 60.0 / self.requests_per_minute)
+        if self._token_budget < tokens:
+            waits.append((tokens - self._token_budget) * 60.0 / self.tokens_per_minute)
+        return max(0.0, *waits)
+
+    def acquire(self, tokens=0, priority=False, timeout=None):
+        """Block until a request estimated at `tokens` tokens may be sent"""
+        tokens = min(tokens, self.tokens_per_minute)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        ticket = (0 if priority else 1, next(self._sequence))
+        with self._condition:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    wait = None
+                    if self._waiters[0] == ticket and self._in_flight < max(1, int(self.concurrency_limit)):
+                        wait = self._wait_time(tokens, now)
+                        if wait == 0:
+                            self._request_budget -= 1
+                            self._token_budget -= tokens
+                            self._in_flight += 1
+                            return
+                    if deadline is not None:
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            raise RateLimitTimeout("Timed out waiting for API capacity")
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._condition.wait(wait)
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._condition.notify_all()
+
+    def release(self, rate_limited=False, retry_after=None, tokens_estimated=0, tokens_used=None):
+        """Return a concurrency slot and feed the outcome back into the AIMD controller"""
+        with self._condition:
+            self._in_flight -= 1
+            if tokens_used is not None:
+                # Refund (or charge) the difference between the estimate and actual usage
+                self._token_budget = min(
+                    float(self.tokens_per_minute),
+                    self._token_budget + tokens_estimated - tokens_used
+                )
+            if rate_limited:
+                self.rate_limited_count += 1
+                self.concurrency_limit = max(float(self.min_concurrency), self.concurrency_limit / 2)
+                if retry_after:
+                    self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            else:
+                self.concurrency_limit = min(
+                    float(self.max_concurrency),
+                    self.concurrency_limit + 1.0 / max(1.0, self.concurrency_limit)
+                )
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, tokens=0, priority=False, timeout=None):
+        """Hold an admission slot for the duration of a request
+
+        The yielded Outcome lets the caller report a 429 or actual token usage;
+        the slot is released with that feedback when the block exits.
+        """
+        self.acquire(tokens, priority=priority, timeout=timeout)
+        outcome = Outcome(tokens)
+        try:
+            yield outcome
+        finally:
+            self.release(
+                rate_limited=outcome.rate_limited,
+                retry_after=outcome.retry_after,
+                tokens_estimated=tokens,
+                tokens_used=outcome.tokens_used
+            )
+
+    def stats(self):
+        """Return a snapshot of limiter state for display"""
+        with self._condition:
+            self._refill(time.monotonic())
+            return {
+                "concurrency_limit": int(self.concurrency_limit),
+                "in_flight": self._in_flight,
+                "waiting": len(self._waiters),
+                "request_budget": int(self._request_budget),
+                "token_budget": int(self._token_budget),
+                "rate_limited": self.rate_limited_count,
+            }
+
+class Outcome:
+    """Feedback about a single admitted request"""
+
+    __slots__ = ("tokens_estimated", "rate_limited", "retry_after", "tokens_used")
+
+    def __init__(self, tokens_estimated):
+        self.tokens_estimated = tokens_estimated
+        self.rate_limited = False
+        self.retry_after = None
+        self.tokens_used = None
+
+def retry_after_seconds(error):
+    """Read the Retry-After delay (in seconds) from an API error's response headers, if any"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt, base=1.0, cap=30.0, retry_after=None):
+    """Full-jitter exponential backoff, never shorter than the server's Retry-After"""
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
@@ -0,0 +1,87 @@
+from dataclasses import dataclass
+
+# Model tiers, best first. Each tier falls back to the next faster model when its
+# model is too slow to respond or is rate-limited.
+DEFAULT_TIERS = {
+    "best": {"model": "gpt-4", "fallback_model": "gpt-4o", "first_token_seconds": 20.0, "response_seconds": 90.0},
+    "standard": {"model": "gpt-4o", "fallback_model": "gpt-4o-mini", "first_token_seconds": 8.0,
+                 "response_seconds": 45.0},
+    "fast": {"model": "gpt-4o-mini", "fallback_model": None, "first_token_seconds": None, "response_seconds": None},
+}
+
+# Output-token budget per analysis type; the fast tier is capped further
+DEFAULT_MAX_TOKENS = {
+    "risk_detection": 900,
+    "change_guidance": 1000,
+    "team_analysis": 800,
+    "recommendations": 1000,
+}
+
+@dataclass(frozen=True)
+class Route:
+    """Model and output budget chosen for one request, and how long to wait before falling back"""
+    name: str
+    model: str
+    max_tokens: int
+    fallback_model: str = None
+    first_token_seconds: float = None  # streamed requests
+    response_seconds: float = None  # non-streamed requests
+
+    def timeout(self, streaming):
+        """Seconds to wait for the primary model before switching to the fallback, or None"""
+        if not self.fallback_model:
+            return None
+        return self.first_token_seconds if streaming else self.response_seconds
+
+class RoutingPolicy:
+    """Choose a model tier and max_tokens from the analysis type, input size and urgency.
+
+    High and Critical urgency and long inputs go to the best tier. Short inputs
+    that are not urgent go to the fast tier with a smaller output budget.
+    Everything else goes to the standard tier. type_tiers maps analysis types
+    to a tier that all of their requests use instead. With routing disabled,
+    every request uses fixed_model and fixed_max_tokens, as before routing
+    existed.
+    """
+
+    def __init__(self, tiers=None, max_tokens=None, short_input_tokens=250, long_input_tokens=2000,
+                 fast_max_tokens=500, enabled=True, fixed_model="gpt-4", fixed_max_tokens=1000, type_tiers=None):
+        self.tiers = tiers or DEFAULT_TIERS
+        self.type_tiers = type_tiers or {}
+        unknown = {tier for tier in self.type_tiers.values() if tier not in self.tiers}
+        if unknown:
+            raise ValueError(f"Unknown routing tier {', '.join(sorted(unknown))}; expected one of {', '.join(self.tiers)}")
+        self.max_tokens = max_tokens or DEFAULT_MAX_TOKENS
+        self.short_input_tokens = short_input_tokens
+        self.long_input_tokens = long_input_tokens
+        self.fast_max_tokens = fast_max_tokens
+        self.enabled = enabled
+        self.fixed_model = fixed_model
+        self.fixed_max_tokens = fixed_max_tokens
+
+    def tier_for(self, input_tokens, urgency=None, analysis_type=None):
+        if analysis_type in self.type_tiers:
+            return self.type_tiers[analysis_type]
+        if urgency in ("High", "Critical") or input_tokens >= self.long_input_tokens:
+            return "best"
+        if input_tokens <= self.short_input_tokens and urgency in (None, "Low"):
+            return "fast"
+        return "standard"
+
+    def select(self, analysis_type, input_tokens, urgency=None):
+        """Return the Route for a request"""
+        if not self.enabled:
+            return Route("fixed", self.fixed_model, self.fixed_max_tokens)
+        name = self.tier_for(input_tokens, urgency, analysis_type)
+        tier = self.tiers[name]
+        max_tokens = self.max_tokens.get(analysis_type, self.fixed_max_tokens)
+        if name == "fast":
+            max_tokens = min(max_tokens, self.fast_max_tokens)
+        return Route(
+            name,
+            tier["model"],
+            max_tokens,
+            fallback_model=tier["fallback_model"] or None,
+            first_token_seconds=tier["first_token_seconds"],
+            response_seconds=tier["response_seconds"]
+        )
@@ -0,0 +1,199 @@
+import re
+import threading
+import time
+import zlib
+import numpy as np
+
+# Cosine similarity above which an earlier answer is reused, per analysis type.
+# Recommendations depend on small details such as dates, so they need a closer match.
+DEFAULT_THRESHOLDS = {
+    "risk_detection": 0.92,
+    "change_guidance": 0.90,
+    "team_analysis": 0.92,
+    "recommendations": 0.95,
+}
+
+# Dates and clock times are folded so a resubmitted report still matches; other numbers are quantities
+DATE_RE = re.compile(r"\b\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}\b")
+TIME_RE = re.compile(r"\b\d{1,2}:\d{2}(:\d{2})?\b")
+NEGATIONS = {"not", "no", "never", "cannot", "without", "nobody", "nothing", "none", "neither", "nor"}
+
+def _hash_features(features, vector):
+    hashes = np.fromiter((zlib.crc32(feature.encode()) for feature in features), dtype=np.uint32,
+                         count=len(features))
+    signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+    np.add.at(vector, (hashes % len(vector)).astype(np.intp), signs)
+    norm = np.linalg.norm(vector)
+    if norm:
+        vector /= norm
+
+class HashingEmbedder:
+    """Offline embedder: signed feature hashing of word unigrams and bigrams.
+
+    Needs no model download or network access. Dates and clock times are folded
+    together so inputs that differ only in them, a name or a few words share
+    almost all features and score close to 1.0. Numbers and negated words
+    ("not use", "no budget") are hashed into a second part of the vector, and
+    the set of them as a whole into a third, which together carry key_weight of
+    the similarity: "2 weeks late" and "8 weeks late", or "will use" and "will
+    not use", fall below the cache thresholds.
+    """
+
+    def __init__(self, dim=128, key_weight=0.4, negation_scope=3):
+        self.dim = dim
+        self.key_weight = key_weight
+        self.negation_scope = negation_scope
+
+    def _key_features(self, tokens):
+        features, negated = [], 0
+        for index, token in enumerate(tokens):
+            if not token[0].isalnum():
+                negated = 0
+                continue
+            if token in NEGATIONS:
+                negated = self.negation_scope
+                continue
+            if negated:
+                features.append(f"not {token}")
+                negated -= 1
+            if token[0].isdigit():
+                following = tokens[index + 1] if index + 1 < len(tokens) else ""
+                features.append(f"#{token} {following}")
+        return features
+
+    def embed(self, text):
+        text = TIME_RE.sub(" time ", DATE_RE.sub(" date ", text.lower())).replace("n't", " not")
+        tokens = re.findall(r"\w+|[^\w\s]", text)
+        words = [token for token in tokens if token[0].isalnum()]
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if not words:
+            return vector
+        key_features = self._key_features(tokens)
+        general, key, key_set = np.split(vector, [self.dim // 2, self.dim * 3 // 4])
+        _hash_features(words + [f"{a} {b}" for a, b in zip(words, words[1:])], general)
+        # Inputs without numbers or negations agree on that, rather than having nothing in common
+        _hash_features(key_features or ["(none)"], key)
+        # Any change to the numbers or negations, however many there are, loses this part entirely
+        _hash_features([" | ".join(sorted(set(key_features)))], key_set)
+        general *= np.sqrt(1.0 - self.key_weight)
+        key *= np.sqrt(self.key_weight * 0.6)
+        key_set *= np.sqrt(self.key_weight * 0.4)
+        return vector
+
+class OpenAIEmbedder:
+    """Embedder backed by the OpenAI embeddings endpoint"""
+
+    def __init__(self, client, model="text-embedding-3-small", dim=128):
+        self.client = client
+        self.model = model
+        self.dim = dim
+
+    def embed(self, text):
+        response = self.client.embeddings.create(model=self.model, input=text, dimensions=self.dim)
+        vector = np.asarray(response.data[0].embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+class _VectorIndex:
+    """Unit vectors and answers for one analysis type and scope in preallocated NumPy arrays"""
+
+    def __init__(self, dim, max_entries):
+        self.size = 0
+        self.max_entries = max_entries
+        self.vectors = np.empty((min(1024, max_entries), dim), dtype=np.float32)
+        self.created_at = np.empty(len(self.vectors), dtype=np.float64)
+        self.last_used = np.empty(len(self.vectors), dtype=np.float64)
+        self.answers = []
+
+    def _grow(self):
+        capacity = min(len(self.vectors) * 2, self.max_entries)
+        for name in ("vectors", "created_at", "last_used"):
+            old = getattr(self, name)
+            grown = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            grown[:self.size] = old[:self.size]
+            setattr(self, name, grown)
+
+    def add(self, vector, answer, now):
+        if self.size < self.max_entries:
+            if self.size == len(self.vectors):
+                self._grow()
+            slot = self.size
+            self.size += 1
+            self.answers.append(answer)
+        else:
+            # Full: overwrite the least recently used entry
+            slot = int(np.argmin(self.last_used[:self.size]))
+            self.answers[slot] = answer
+        self.vectors[slot] = vector
+        self.created_at[slot] = now
+        self.last_used[slot] = now
+
+    def best(self, vector, oldest):
+        if not self.size:
+            return None, 0.0
+        scores = self.vectors[:self.size] @ vector
+        scores[self.created_at[:self.size] < oldest] = -1.0
+        slot = int(np.argmax(scores))
+        return slot, float(scores[slot])
+
+class SemanticCache:
+    """Near-duplicate answer cache searched by cosine similarity, one index per analysis type and scope.
+
+    Lookups are a single matrix-vector product over the index's unit vectors, so
+    100k entries of 128 dimensions are scanned in a few milliseconds. The scope
+    separates requests that must never share answers even when their text is
+    nearly identical, such as different urgency levels. Entries older than
+    ttl_seconds are ignored and each index evicts least-recently-used entries
+    beyond max_entries. The cache lives in process memory.
+    """
+
+    def __init__(self, embedder, thresholds=None, max_entries=20000, ttl_seconds=7 * 24 * 3600):
+        self.embedder = embedder
+        self.thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._indexes = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def embed(self, text):
+        """Embed text with the configured embedder"""
+        return self.embedder.embed(text)
+
+    def lookup(self, analysis_type, vector, scope=""):
+        """Return (answer, similarity) of the closest fresh entry above the type's threshold, else (None, similarity)"""
+        now = time.time()
+        with self._lock:
+            index = self._indexes.get((analysis_type, scope))
+            slot, similarity = index.best(vector, now - self.ttl_seconds) if index else (None, 0.0)
+            if slot is None or similarity < self.thresholds.get(analysis_type, 1.0):
+                self.misses += 1
+                return None, similarity
+            index.last_used[slot] = now
+            self.hits += 1
+            return index.answers[slot], similarity
+
+    def add(self, analysis_type, vector, answer, scope=""):
+        """Store an answer under its input's vector"""
+        with self._lock:
+            index = self._indexes.get((analysis_type, scope))
+            if index is None:
+                index = self._indexes[(analysis_type, scope)] = _VectorIndex(len(vector), self.max_entries)
+            index.add(vector, answer, time.time())
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._indexes.clear()
+
+    def stats(self):
+        """Return hit/miss counters and the number of stored entries"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": sum(index.size for index in self._indexes.values()),
+            }
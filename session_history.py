@@ -0,0 +1,159 @@
+import json
+import os
+import time
+import uuid
+import weakref
+import zlib
+from datetime import datetime
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M"
+
+# Rough per-record cost of the record object itself, on top of its compressed text
+RECORD_OVERHEAD_BYTES = 120
+
+class HistoryRecord:
+    """One analysis in a session's history, with input and output compressed together"""
+    __slots__ = ("created_at", "type", "blob", "spill_offset", "spill_length")
+
+    def __init__(self, created_at, entry_type, blob):
+        self.created_at = created_at
+        self.type = entry_type
+        self.blob = blob
+        self.spill_offset = None
+        self.spill_length = None
+
+    @property
+    def spilled(self):
+        return self.blob is None
+
+class SessionHistory:
+    """A session's analysis history, kept within a memory budget.
+
+    Inputs and outputs are stored zlib-compressed. Once the compressed text held
+    in memory exceeds memory_budget bytes, the oldest entries are moved to a spill
+    file in spill_dir and read back when the history is paged or iterated. The
+    newest entry always stays in memory. The spill file is deleted when the
+    history is cleared or garbage collected; files left behind by a crashed
+    process are removed by prune_spill_files.
+    """
+
+    def __init__(self, spill_dir, memory_budget=262144):
+        self.spill_dir = spill_dir
+        self.memory_budget = memory_budget
+        self.spill_path = os.path.join(spill_dir, f"{uuid.uuid4().hex}.bin")
+        self._records = []
+        self._memory_bytes = 0
+        self._spill_size = 0
+        self._finalizer = weakref.finalize(self, _remove_file, self.spill_path)
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self):
+        """Yield entries oldest first as dicts with timestamp, type, input and output"""
+        return iter(self._load(list(enumerate(self._records))))
+
+    def page(self, limit, offset=0):
+        """Return up to limit entries newest first, skipping the newest offset, each with its index as id"""
+        indexed = list(enumerate(self._records))[::-1][offset:offset + limit]
+        return self._load(indexed)
+
+    def _load(self, indexed):
+        """Decompress (index, record) pairs into entry dicts, reading spilled ones from the spill file"""
+        entries = []
+        spill = None
+        try:
+            for index, record in indexed:
+                if record.spilled:
+                    if spill is None:
+                        try:
+                            spill = open(self.spill_path, "rb")
+                        except FileNotFoundError:
+                            # Pruned as stale while the session was idle
+                            continue
+                    spill.seek(record.spill_offset)
+                    blob = spill.read(record.spill_length)
+                else:
+                    blob = record.blob
+                user_input, output = json.loads(zlib.decompress(blob))
+                entries.append({
+                    "id": index,
+                    "timestamp": datetime.fromtimestamp(record.created_at).strftime(TIMESTAMP_FORMAT),
+                    "type": record.type,
+                    "input": user_input,
+                    "output": output
+                })
+        finally:
+            if spill is not None:
+                spill.close()
+        return entries
+
+    @property
+    def memory_bytes(self):
+        """Approximate bytes held in memory by the entries"""
+        return self._memory_bytes + RECORD_OVERHEAD_BYTES * len(self._records)
+
+    def append(self, entry_type, user_input, output, created_at=None):
+        """Add an analysis, spilling older entries to disk if the budget is exceeded"""
+        blob = zlib.compress(json.dumps([user_input, output]).encode())
+        self._records.append(HistoryRecord(created_at or time.time(), entry_type, blob))
+        self._memory_bytes += len(blob)
+        if self.memory_bytes > self.memory_budget:
+            self._spill()
+
+    def _spill(self):
+        os.makedirs(self.spill_dir, exist_ok=True)
+        with open(self.spill_path, "ab") as spill:
+            for record in self._records[:-1]:
+                if self.memory_bytes <= self.memory_budget:
+                    break
+                if record.spilled:
+                    continue
+                spill.write(record.blob)
+                record.spill_offset = self._spill_size
+                record.spill_length = len(record.blob)
+                self._spill_size += record.spill_length
+                self._memory_bytes -= record.spill_length
+                record.blob = None
+
+    def clear(self):
+        """Forget every entry and delete the spill file"""
+        self._records = []
+        self._memory_bytes = 0
+        self._spill_size = 0
+        _remove_file(self.spill_path)
+
+    def stats(self):
+        """Return entry counts and the memory held, for display"""
+        spilled = sum(1 for record in self._records if record.spilled)
+        return {
+            "entries": len(self._records),
+            "in_memory": len(self._records) - spilled,
+            "spilled": spilled,
+            "memory_bytes": self.memory_bytes,
+            "spill_bytes": self._spill_size
+        }
+
+def prune_spill_files(spill_dir, max_age_seconds, now=None):
+    """Delete spill files not written for max_age_seconds and return how many were removed"""
+    cutoff = (now or time.time()) - max_age_seconds
+    removed = 0
+    try:
+        names = os.listdir(spill_dir)
+    except FileNotFoundError:
+        return 0
+    for name in names:
+        path = os.path.join(spill_dir, name)
+        try:
+            if name.endswith(".bin") and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
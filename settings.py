@@ -0,0 +1,25 @@
+import os
+import streamlit as st
+
+# Directory for on-disk state shared between worker processes (caches, stores)
+DEFAULT_DATA_DIR = ".data"
+
+def get_setting(name, default=None):
+    """Read a setting from Streamlit secrets, then environment variables, then the default"""
+    try:
+        value = st.secrets[name]
+    except Exception:
+        value = os.environ.get(name)
+    if value is None:
+        return default
+    if isinstance(default, bool) and isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    if default is not None and not isinstance(value, type(default)):
+        return type(default)(value)
+    return value
+
+def data_path(filename):
+    """Return a path inside the shared data directory, creating the directory if needed"""
+    data_dir = get_setting("DATA_DIR", DEFAULT_DATA_DIR)
+    os.makedirs(data_dir, exist_ok=True)
+    return os.path.join(data_dir, filename)
@@ -0,0 +1,70 @@
+import threading
+import time
+
+class SingleFlightTimeout(TimeoutError):
+    """Raised when a caller gives up waiting for an identical in-flight call"""
+
+class _Flight:
+    __slots__ = ("done", "value", "error", "followers")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.followers = 0
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one execution.
+
+    The first caller for a key (the leader) runs the function; callers arriving
+    while it is in flight wait for its outcome and receive the same value or
+    exception. Nothing is kept once the call completes, so this only absorbs
+    bursts of identical requests; it is not a cache. If the leader fails with one
+    of abandon_errors (it gave up for its own reasons, e.g. its job was
+    cancelled), waiting callers retry instead of inheriting that error.
+    """
+
+    def __init__(self, abandon_errors=()):
+        self.abandon_errors = tuple(abandon_errors)
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, timeout=None):
+        """Return (fn(), shared) where shared is True if another caller's execution was reused"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+                    self.leaders += 1
+                else:
+                    flight.followers += 1
+                    self.coalesced += 1
+            if leader:
+                try:
+                    flight.value = fn()
+                except BaseException as e:
+                    flight.error = e
+                    raise
+                finally:
+                    with self._lock:
+                        del self._flights[key]
+                    flight.done.set()
+                return flight.value, False
+
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not flight.done.wait(remaining):
+                raise SingleFlightTimeout(f"Timed out after {timeout:g}s waiting for an identical request")
+            if flight.error is None:
+                return flight.value, True
+            if not isinstance(flight.error, self.abandon_errors):
+                raise flight.error
+
+    def stats(self):
+        """Return counts of executed and coalesced calls and of calls in flight"""
+        with self._lock:
+            return {"leaders": self.leaders, "coalesced": self.coalesced, "in_flight": len(self._flights)}
@@ -0,0 +1,61 @@
+from functools import lru_cache
+
+# Average characters per token for English text when tiktoken is unavailable
+CHARS_PER_TOKEN = 4
+
+@lru_cache(maxsize=8)
+def _encoding(model):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+def count_tokens(text, model="gpt-4"):
+    """Count tokens with tiktoken when installed, otherwise estimate from character length"""
+    encoding = _encoding(model)
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+def split_into_chunks(text, chunk_tokens, overlap_tokens=0, model="gpt-4"):
+    """Split text into chunks of at most chunk_tokens tokens on line boundaries
+
+    Consecutive chunks share roughly overlap_tokens tokens of trailing lines so
+    findings that straddle a boundary are visible to both. Lines longer than a
+    whole chunk are cut by characters.
+    """
+    overlap_tokens = min(overlap_tokens, chunk_tokens // 2)
+    lines = []
+    for line in text.splitlines(keepends=True):
+        line_tokens = count_tokens(line, model)
+        if line_tokens <= chunk_tokens:
+            lines.append((line, line_tokens))
+            continue
+        piece_chars = max(1, len(line) * chunk_tokens // line_tokens)
+        for start in range(0, len(line), piece_chars):
+            piece = line[start:start + piece_chars]
+            lines.append((piece, count_tokens(piece, model)))
+
+    chunks, current, current_tokens = [], [], 0
+    for line, line_tokens in lines:
+        if current and current_tokens + line_tokens > chunk_tokens:
+            chunks.append("".join(part for part, _ in current))
+            # Carry trailing lines into the next chunk as overlap
+            carried, carried_tokens = [], 0
+            for part, part_tokens in reversed(current):
+                if carried_tokens + part_tokens > overlap_tokens:
+                    break
+                carried.insert(0, (part, part_tokens))
+                carried_tokens += part_tokens
+            if carried_tokens + line_tokens > chunk_tokens:
+                carried, carried_tokens = [], 0
+            current, current_tokens = carried, carried_tokens
+        current.append((line, line_tokens))
+        current_tokens += line_tokens
+    if current:
+        chunks.append("".join(part for part, _ in current))
+    return chunks
@@ -0,0 +1,269 @@
+"""Benchmark local hot paths at realistic history sizes, offline, and compare against a baseline.
+
+For each history size a fresh process seeds a throwaway DATA_DIR and times:
+the overhead of an analysis call with the OpenAI client stubbed out (plain,
+streamed, cache hit, and persisting the result), the signed-in render of
+app.py including its Analysis History panel, and the Usage Analytics building
+blocks (columnar frame build, type filter, search, timeline) plus a rerun of
+that page. Save results with --json and compare a later run against them:
+
+    python tools/benchmark.py --sizes 100 10000 100000 --json before.json
+    python tools/benchmark.py --baseline before.json --threshold 0.25
+
+Exits with status 1 when any benchmark's median is slower than the baseline by
+more than the threshold (and by more than --min-delta-ms).
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+USERNAME = "manager"
+
+WORDS = (
+    "adoption resistance stakeholder timeline budget training rollout finance migration vendor milestone "
+    "sponsor workshop morale attrition governance dependency escalation pilot readiness communication "
+    "cut-over backlog approval process regional leadership feedback survey delay scope risk"
+).split()
+
+SAMPLE_INPUT = (
+    "Weekly status: the finance workstream reports the ERP cut-over slipped two weeks. "
+    "Middle managers question the new approval flow and training attendance dropped to 60%."
+)
+
+SAMPLE_OUTPUT = "**Key risks**\n\n1. Schedule slip on the ERP cut-over.\n2. Resistance from middle managers.\n" * 8
+
+class StubCompletions:
+    """Stands in for client.chat.completions, answering instantly like a minimal API response"""
+
+    def create(self, messages, model, stream=False, **params):
+        usage = SimpleNamespace(prompt_tokens=120, completion_tokens=200, total_tokens=320)
+        if not stream:
+            message = SimpleNamespace(content=SAMPLE_OUTPUT)
+            return SimpleNamespace(model=model, usage=usage, choices=[SimpleNamespace(message=message)])
+        chunks = [
+            SimpleNamespace(model=model, usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=line))])
+            for line in SAMPLE_OUTPUT.splitlines(keepends=True)
+        ]
+        return iter(chunks + [SimpleNamespace(model=model, usage=usage, choices=[])])
+
+class StubClient:
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=StubCompletions())
+
+def seed_history(store, size, seed=0):
+    """Insert size entries for USERNAME spread over the last 30 days, as the app would record them"""
+    from analysis import ANALYSIS_TYPE_LABELS
+
+    rng = random.Random(seed)
+    labels = list(ANALYSIS_TYPE_LABELS.values())
+    now = time.time()
+    rows = []
+    for index in range(size):
+        text = " ".join(rng.choices(WORDS, k=rng.randint(30, 120)))
+        cached = rng.random() < 0.2
+        rows.append((
+            USERNAME, now - 30 * 86400 * (size - index) / size, labels[index % len(labels)],
+            f"Report {index}: {text}", SAMPLE_OUTPUT,
+            rng.lognormvariate(7.5, 0.4), None if cached else rng.lognormvariate(6.5, 0.4),
+            0 if cached else rng.randint(150, 1500), 0 if cached else rng.randint(200, 900),
+            "gpt-4o", "cached" if cached else "ok"
+        ))
+    conn = store._connect()
+    with conn:
+        conn.executemany(
+            """INSERT INTO history (username, created_at, type, input, output, latency_ms, ttft_ms,
+                    prompt_tokens, completion_tokens, model, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            rows
+        )
+
+def summarize(samples):
+    """Median, p90 and minimum of timings in milliseconds"""
+    ordered = sorted(samples)
+    return {
+        "median_ms": round(statistics.median(ordered), 3),
+        "p90_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))], 3),
+        "min_ms": round(ordered[0], 3),
+        "runs": len(ordered),
+    }
+
+def measure(function, repeat, warmup=1):
+    """Run function warmup + repeat times and summarise the timed runs"""
+    for _ in range(warmup):
+        function()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - started) * 1000)
+    return summarize(samples)
+
+def run_size(size, repeat):
+    """Seed a fresh DATA_DIR with size history entries and return {benchmark: summary}"""
+    data_dir = tempfile.mkdtemp(prefix=f"benchmark-{size}-")
+    os.environ["DATA_DIR"] = data_dir
+    os.environ["METRICS_TEXTFILE_DIR"] = os.path.join(data_dir, "metrics")
+    os.environ["OPENAI_WARM_UP"] = "false"
+    # The shared rate limiter would otherwise start pacing the stubbed calls
+    os.environ["RATE_LIMIT_RPM"] = os.environ["RATE_LIMIT_TPM"] = "100000000"
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+
+    from streamlit.testing.v1 import AppTest
+    from analysis import get_history_store, perform_analysis, persist_analysis
+    from analytics_frame import AnalyticsFrame
+
+    # Streamlit's deprecation notices and bare-mode warnings would bury the report
+    logging.disable(logging.WARNING)
+    store = get_history_store()
+    started = time.perf_counter()
+    seed_history(store, size)
+    seed_seconds = time.perf_counter() - started
+    results = {}
+    client = StubClient()
+    counter = iter(range(10 ** 9))
+
+    # A distinct input per call keeps the response and semantic caches from answering
+    def fresh_input():
+        return f"{SAMPLE_INPUT} Run {next(counter)} {random.choice(WORDS)}."
+
+    results["analysis.overhead"] = measure(
+        lambda: perform_analysis(fresh_input(), "risk_detection", use_cache=False, client=client), repeat * 4
+    )
+    results["analysis.overhead_streamed"] = measure(
+        lambda: perform_analysis(fresh_input(), "risk_detection", False, lambda token: None, client=client),
+        repeat * 4
+    )
+    results["analysis.overhead_with_caches"] = measure(
+        lambda: perform_analysis(fresh_input(), "risk_detection", use_cache=True, client=client), repeat * 4
+    )
+    perform_analysis(SAMPLE_INPUT, "risk_detection", use_cache=True, client=client)
+    results["analysis.cache_hit"] = measure(
+        lambda: perform_analysis(SAMPLE_INPUT, "risk_detection", use_cache=True, client=client), repeat * 4
+    )
+    result = perform_analysis(SAMPLE_INPUT, "risk_detection", use_cache=False, client=client)
+    results["analysis.persist"] = measure(
+        lambda: persist_analysis(USERNAME, "Risk Detection", SAMPLE_INPUT, result), repeat * 4
+    )
+
+    # Signed-in render of the main page; the Analysis History section is timed by the app itself
+    app = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=120)
+    app.secrets["OPENAI_API_KEY"] = "sk-benchmark"
+    app.session_state["authenticated"] = True
+    app.session_state["username"] = USERNAME
+    history_samples = []
+
+    def render_main():
+        app.run()
+        if app.exception:
+            raise RuntimeError(app.exception[0].value)
+        history_samples.append(app.session_state["render_timings"].get("Analysis History", 0.0))
+
+    results["app.main_render"] = measure(render_main, repeat)
+    results["app.history_section"] = summarize(history_samples[1:])
+
+    # Usage Analytics building blocks, then a rerun of the page itself
+    results["analytics.frame_build"] = measure(lambda: AnalyticsFrame().sync(store, USERNAME), repeat)
+    frame = AnalyticsFrame().sync(store, USERNAME)
+    selected = frame.categories[:2]
+    results["analytics.filter"] = measure(lambda: frame.type_counts(frame.mask(types=selected)), repeat * 4)
+    results["analytics.search"] = measure(
+        lambda: frame.mask(types=selected, ids=store.matching_ids(USERNAME, "resistance escalation")), repeat
+    )
+    results["analytics.search_ranked"] = measure(
+        lambda: store.search(USERNAME, "resistance escalation", types=selected, limit=10), repeat
+    )
+    mask = frame.mask(types=selected)
+    results["analytics.timeline"] = measure(lambda: frame.timeline(mask, bucket_seconds=60), repeat * 4)
+
+    page = AppTest.from_file(os.path.join(ROOT, "pages", "Usage_Analytics.py"), default_timeout=120)
+    page.session_state["authenticated"] = True
+    page.session_state["username"] = USERNAME
+
+    def render_page():
+        page.run()
+        if page.exception:
+            raise RuntimeError(page.exception[0].value)
+
+    results["analytics.page_render"] = measure(render_page, repeat)
+    return {"seed_seconds": round(seed_seconds, 2), "benchmarks": results}
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(report, baseline, threshold, min_delta_ms):
+    """Return [(size, benchmark, baseline_ms, current_ms, change)] for medians that regressed"""
+    regressions = []
+    for size, current in report["sizes"].items():
+        previous = baseline.get("sizes", {}).get(size)
+        if previous is None:
+            continue
+        for name, summary in current["benchmarks"].items():
+            before = previous["benchmarks"].get(name)
+            if before is None:
+                continue
+            delta = summary["median_ms"] - before["median_ms"]
+            if delta > min_delta_ms and delta > threshold * before["median_ms"]:
+                regressions.append((size, name, before["median_ms"], summary["median_ms"], delta / before["median_ms"]))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10000, 100000], help="history entries")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark (fast ones run 4x)")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="earlier --json results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown of a median, as a fraction")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "sizes": {},
+    }
+    # A fresh process per size, so no size sees another's caches or process-wide resources
+    context = multiprocessing.get_context("spawn")
+    for size in args.sizes:
+        with context.Pool(1) as pool:
+            report["sizes"][str(size)] = pool.apply(run_size, (size, args.repeat))
+        print(f"{size:,} history entries (seeded in {report['sizes'][str(size)]['seed_seconds']:.1f} s)")
+        for name, summary in report["sizes"][str(size)]["benchmarks"].items():
+            print(f"    {name:<32} median {summary['median_ms']:>10.2f} ms   p90 {summary['p90_ms']:>10.2f} ms")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        regressions = compare(report, baseline, args.threshold, args.min_delta_ms)
+        for size, name, before, after, change in regressions:
+            print(f"REGRESSION {name} at {int(size):,} entries: {before:.2f} ms -> {after:.2f} ms (+{change:.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline} (revision {baseline.get('revision')})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Drive simulated users through login and the four analysis tabs and report capacity.
+
+Each user is a Streamlit AppTest session of app.py in its own process (AppTest
+sessions cannot run concurrently in one process), so users behave like sessions
+spread over server worker processes: they share the SQLite-backed response
+cache, history and usage rollups in DATA_DIR, but not in-process state such as
+the rate limiter. Point it at the mock server to avoid spending credits:
+
+    python tools/load_test.py --users 20 --iterations 3 --start-mock --latency-median 1.5
+"""
+import argparse
+import json
+import os
+import multiprocessing
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "tools"))
+
+from mock_openai_server import add_config_arguments, config_from_args, serve  # noqa: E402
+
+# (tab name, index of its text area and of its tab, button key)
+TABS = [
+    ("Risk Detection", 0, "risk_btn"),
+    ("Change Guidance", 1, "guidance_btn"),
+    ("Team Analysis", 2, "team_btn"),
+    ("Recommendations", 3, "rec_btn"),
+]
+
+SAMPLE_INPUT = (
+    "Weekly status: the finance workstream reports the ERP cut-over slipped two weeks. "
+    "Middle managers question the new approval flow and training attendance dropped to 60%."
+)
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def wait_for_jobs(at, poll_seconds, timeout):
+    """Rerun like the browser's polling timer until no analysis on the page is still running"""
+    deadline = time.monotonic() + timeout
+    while any(button.label == "Cancel" for button in at.button) and time.monotonic() < deadline:
+        time.sleep(poll_seconds)
+        at.run()
+
+def run_user(user, args):
+    """Log in as one simulated user, run every tab args.iterations times and return (tab, seconds, failed) samples"""
+    from streamlit.testing.v1 import AppTest
+
+    os.chdir(ROOT)
+    samples = []
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=args.timeout)
+    at.secrets["OPENAI_API_KEY"] = "sk-load-test"
+    at.run()
+    at.text_input(key="login_username").input(args.username)
+    at.text_input(key="login_password").input(args.password)
+    [button for button in at.button if button.label == "Login"][0].click().run()
+
+    for iteration in range(args.iterations):
+        for tab, area_index, button_key in TABS:
+            text = SAMPLE_INPUT if args.repeat_inputs else f"User {user}, round {iteration}. {SAMPLE_INPUT}"
+            at.text_area[area_index].input(text).run()
+            started = time.perf_counter()
+            try:
+                at.button(key=button_key).click().run()
+                wait_for_jobs(at, float(os.environ["JOB_POLL_SECONDS"]), args.timeout)
+                # Only this tab's panel counts: other tabs may still show an earlier failure
+                panel = at.tabs[area_index]
+                failed = bool(at.exception) or any(element.value.startswith("⚠️") for element in panel.error)
+                failed = failed or any(element.value.startswith("⚠️") for element in panel.markdown)
+            except Exception:
+                failed = True
+            samples.append((tab, time.perf_counter() - started, failed))
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10, help="concurrent simulated users")
+    parser.add_argument("--iterations", type=int, default=1, help="rounds through all four tabs per user")
+    parser.add_argument("--username", default="manager")
+    parser.add_argument("--password", default="change2024")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8001/v1", help="OpenAI-compatible endpoint")
+    parser.add_argument("--start-mock", action="store_true", help="start the mock server in this process")
+    parser.add_argument("--mock-port", type=int, default=8001)
+    parser.add_argument("--repeat-inputs", action="store_true",
+                        help="send identical inputs to exercise caching and request coalescing")
+    parser.add_argument("--timeout", type=float, default=300.0, help="seconds allowed per script run")
+    parser.add_argument("--json", help="also write the report to this file")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    if args.start_mock:
+        serve(config_from_args(args), port=args.mock_port)
+        args.base_url = f"http://127.0.0.1:{args.mock_port}/v1"
+    os.environ["OPENAI_BASE_URL"] = args.base_url
+    os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="load-test-"))
+    os.environ.setdefault("JOB_POLL_SECONDS", "0.1")
+
+    started = time.perf_counter()
+    with multiprocessing.get_context("spawn").Pool(args.users) as pool:
+        results = pool.starmap(run_user, [(user, args) for user in range(args.users)])
+    wall_seconds = time.perf_counter() - started
+
+    samples, errors = {}, {}
+    for tab, elapsed, failed in (sample for user_samples in results for sample in user_samples):
+        samples.setdefault(tab, []).append(elapsed)
+        if failed:
+            errors[tab] = errors.get(tab, 0) + 1
+
+    all_samples = [value for values in samples.values() for value in values]
+    report = {
+        "users": args.users,
+        "iterations": args.iterations,
+        "wall_seconds": round(wall_seconds, 2),
+        "analyses": len(all_samples),
+        "errors": sum(errors.values()),
+        "throughput_per_second": round(len(all_samples) / wall_seconds, 3) if wall_seconds else 0.0,
+        "tabs": {
+            tab: {
+                "count": len(values),
+                "errors": errors.get(tab, 0),
+                "p50_seconds": round(percentile(values, 50), 3),
+                "p99_seconds": round(percentile(values, 99), 3),
+                "mean_seconds": round(statistics.fmean(values), 3),
+            }
+            for tab, values in samples.items()
+        },
+        "p50_seconds": round(percentile(all_samples, 50), 3),
+        "p99_seconds": round(percentile(all_samples, 99), 3),
+    }
+
+    print(f"{args.users} users x {args.iterations} rounds: {report['analyses']} analyses in {wall_seconds:.1f}s "
+          f"({report['throughput_per_second']:.2f}/s), {report['errors']} errors")
+    print(f"{'tab':<18}{'count':>7}{'errors':>8}{'p50 s':>9}{'p99 s':>9}")
+    for tab, row in report["tabs"].items():
+        print(f"{tab:<18}{row['count']:>7}{row['errors']:>8}{row['p50_seconds']:>9.2f}{row['p99_seconds']:>9.2f}")
+    print(f"{'all':<18}{report['analyses']:>7}{report['errors']:>8}{report['p50_seconds']:>9.2f}{report['p99_seconds']:>9.2f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""Local stand-in for the OpenAI API, for load tests that must not spend credits.
+
+Serves /v1/chat/completions (plain and streamed), /v1/embeddings and /v1/models.
+Latency follows a log-normal distribution, streamed tokens are paced at a fixed
+rate, and a configurable share of requests fail with 429 or 500.
+
+    python tools/mock_openai_server.py --port 8001 --latency-median 1.5 --rate-limit-rate 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 streamlit run app.py
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "stakeholder alignment remains uneven across workstreams and middle management shows early signs of "
+    "resistance to the new operating model; prioritise targeted communication, sponsor visibility and "
+    "short feedback loops while tracking adoption metrics weekly"
+).split()
+
+class MockConfig:
+    """Behaviour of the mock server"""
+
+    def __init__(self, latency_median=1.0, latency_sigma=0.5, tokens_per_second=50.0, completion_tokens=200,
+                 rate_limit_rate=0.0, error_rate=0.0, retry_after=1.0, seed=None):
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def sample_latency(self):
+        """Seconds before the first byte of a response"""
+        with self.lock:
+            return self.latency_median * math.exp(self.random.gauss(0.0, self.latency_sigma))
+
+    def sample_failure(self):
+        """Return 429, 500 or None for the next request"""
+        with self.lock:
+            self.requests += 1
+            roll = self.random.random()
+        if roll < self.rate_limit_rate:
+            return 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 500
+        return None
+
+def _prompt_tokens(messages):
+    return sum(len(str(message.get("content", ""))) for message in messages) // 4 + 4 * len(messages)
+
+def make_handler(config):
+    class MockOpenAIHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                # The client gave up waiting (e.g. a routing latency budget ran out)
+                pass
+
+        def _send_error(self, status):
+            if status == 429:
+                self._send_json(
+                    429,
+                    {"error": {"message": "Rate limit reached (mock)", "type": "requests", "code": "rate_limit_exceeded"}},
+                    {"Retry-After": f"{config.retry_after:g}"}
+                )
+            else:
+                self._send_json(500, {"error": {"message": "Internal error (mock)", "type": "server_error", "code": None}})
+
+        def _read_json(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/models"):
+                self._send_json(200, {"object": "list", "data": [
+                    {"id": "gpt-4", "object": "model", "created": 0, "owned_by": "mock"}
+                ]})
+            else:
+                self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error", "code": None}})
+
+        def do_POST(self):
+            request = self._read_json()
+            if self.path.endswith("/chat/completions"):
+                self._chat_completions(request)
+            elif self.path.endswith("/embeddings"):
+                self._embeddings(request)
+            else:
+                self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error", "code": None}})
+
+        def _chat_completions(self, request):
+            failure = config.sample_failure()
+            time.sleep(config.sample_latency())
+            if failure:
+                self._send_error(failure)
+                return
+            model = request.get("model", "gpt-4")
+            count = min(config.completion_tokens, request.get("max_tokens") or config.completion_tokens)
+            tokens = [WORDS[i % len(WORDS)] + " " for i in range(count)]
+            usage = {
+                "prompt_tokens": _prompt_tokens(request.get("messages", [])),
+                "completion_tokens": count,
+                "total_tokens": _prompt_tokens(request.get("messages", [])) + count,
+            }
+            completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+            created = int(time.time())
+            if not request.get("stream"):
+                time.sleep(count / config.tokens_per_second)
+                self._send_json(200, {
+                    "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": "".join(tokens)}}],
+                    "usage": usage,
+                })
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def event(payload):
+                data = f"data: {payload}\n\n".encode()
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def chunk(delta, finish_reason=None, chunk_usage=None):
+                return json.dumps({
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [] if chunk_usage else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                    "usage": chunk_usage,
+                })
+
+            try:
+                event(chunk({"role": "assistant", "content": ""}))
+                for token in tokens:
+                    time.sleep(1 / config.tokens_per_second)
+                    event(chunk({"content": token}))
+                event(chunk({}, finish_reason="stop"))
+                if (request.get("stream_options") or {}).get("include_usage"):
+                    event(chunk(None, chunk_usage=usage))
+                event("[DONE]")
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                # The client stopped reading (e.g. a cancelled job)
+                pass
+
+        def _embeddings(self, request):
+            inputs = request.get("input")
+            inputs = inputs if isinstance(inputs, list) else [inputs]
+            dimensions = request.get("dimensions") or 128
+            data = []
+            for index, text in enumerate(inputs):
+                rng = random.Random(str(text))
+                data.append({"object": "embedding", "index": index,
+                             "embedding": [rng.gauss(0.0, 1.0) for _ in range(dimensions)]})
+            self._send_json(200, {"object": "list", "data": data, "model": request.get("model"),
+                                  "usage": {"prompt_tokens": 0, "total_tokens": 0}})
+
+    return MockOpenAIHandler
+
+def serve(config, host="127.0.0.1", port=8001):
+    """Start the mock server on a daemon thread and return the server"""
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def add_config_arguments(parser):
+    """Register the MockConfig options on an argparse parser"""
+    parser.add_argument("--latency-median", type=float, default=1.0, help="median seconds before the first byte")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="log-normal spread of that latency")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="completion token rate")
+    parser.add_argument("--completion-tokens", type=int, default=200, help="tokens per completion")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 500")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for reproducible runs")
+
+def config_from_args(args):
+    return MockConfig(
+        latency_median=args.latency_median,
+        latency_sigma=args.latency_sigma,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        rate_limit_rate=args.rate_limit_rate,
+        error_rate=args.error_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    server = serve(config_from_args(args), args.host, args.port)
+    print(f"Mock OpenAI API listening on http://{args.host}:{args.port}/v1")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
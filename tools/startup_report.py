@@ -0,0 +1,104 @@
+"""Report cold-start cost: import breakdown and time to first render of the login page.
+
+Runs app.py in a fresh interpreter under `python -X importtime` through Streamlit's
+AppTest, once as a visitor (login_page) and once more as a signed-in user
+(main_app), and lists the slowest imports each of those renders triggered.
+Run it before and after changes that touch module-level imports:
+
+    python tools/startup_report.py --top 15 --json startup.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MARKER = "startup-report:"
+
+# Executed in the child interpreter; phase markers go to stderr between the importtime lines
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+framework = time.perf_counter()
+at = AppTest.from_file({app!r}, default_timeout={timeout!r})
+at.secrets["OPENAI_API_KEY"] = "sk-startup-report"
+sys.stderr.write("{marker} login\\n"); sys.stderr.flush()
+at.run()
+login = time.perf_counter()
+sys.stderr.write("{marker} main\\n"); sys.stderr.flush()
+at.session_state["authenticated"] = True
+at.session_state["username"] = {username!r}
+at.run()
+main = time.perf_counter()
+errors = [str(element.value) for element in at.exception]
+print(json.dumps({{"framework": framework - started, "login": login - framework, "main": main - login, "errors": errors}}))
+"""
+
+def parse_importtime(stderr):
+    """Split -X importtime output into phases and return {phase: [(module, cumulative_us)]} for top-level imports"""
+    phases, phase = {"framework": []}, "framework"
+    for line in stderr.splitlines():
+        if line.startswith(MARKER):
+            phase = line[len(MARKER):].strip()
+            phases[phase] = []
+            continue
+        if not line.startswith("import time:") or line.startswith("import time: self"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        # Nested imports are indented by two spaces per level below the first
+        if name.startswith(" ") and not name.startswith("   "):
+            phases[phase].append((name.strip(), int(cumulative)))
+    return phases
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top", type=int, default=10, help="slowest imports listed per phase")
+    parser.add_argument("--username", default="manager", help="user the signed-in render runs as")
+    parser.add_argument("--warm-up", action="store_true", help="let the login page start the OpenAI client warm-up")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="startup-report-"))
+    # Without the warm-up thread, every import is attributed to the render that needed it
+    env["OPENAI_WARM_UP"] = "true" if args.warm_up else "false"
+    child = CHILD.format(app=os.path.join(ROOT, "app.py"), timeout=args.timeout, username=args.username, marker=MARKER)
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", child], cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        sys.exit(completed.stderr[-2000:])
+    timings = json.loads(completed.stdout.strip().splitlines()[-1])
+    imports = parse_importtime(completed.stderr)
+
+    labels = {
+        "framework": "Streamlit + AppTest import",
+        "login": "First render of login_page()",
+        "main": "First render after login (main_app())",
+    }
+    report = {"phases": {}, "errors": timings["errors"]}
+    for phase, label in labels.items():
+        modules = sorted(imports.get(phase, []), key=lambda item: item[1], reverse=True)
+        report["phases"][phase] = {
+            "label": label,
+            "seconds": round(timings[phase], 3),
+            "import_seconds": round(sum(us for _, us in modules) / 1e6, 3),
+            "slowest_imports_ms": {name: round(us / 1000, 1) for name, us in modules[:args.top]},
+        }
+
+    for phase in report["phases"].values():
+        print(f"{phase['label']}: {phase['seconds'] * 1000:.0f} ms ({phase['import_seconds'] * 1000:.0f} ms importing)")
+        for name, ms in phase["slowest_imports_ms"].items():
+            print(f"    {ms:>9.1f} ms  {name}")
+    for error in report["errors"]:
+        print(f"Script error: {error}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import sqlite3
+import threading
+import time
+from db import ThreadLocalConnection
+
+# Bucket width in seconds and how long buckets are kept (None keeps them forever)
+GRANULARITIES = {
+    "minute": (60, 2 * 24 * 3600),
+    "hour": (3600, 90 * 24 * 3600),
+    "day": (86400, None),
+}
+
+class UsageRollups:
+    """Pre-aggregated usage counters per user and analysis type, shared across worker processes.
+
+    Each recorded analysis increments one minute, one hour and one day bucket with
+    an UPSERT inside a single IMMEDIATE transaction, so concurrent writers from
+    several processes serialise on SQLite's write lock without losing updates.
+    Dashboards read a bounded number of buckets instead of scanning raw history.
+    """
+
+    def __init__(self, path, prune_every=500):
+        self.path = path
+        self.prune_every = prune_every
+        self._db = ThreadLocalConnection(path, row_factory=sqlite3.Row, isolation_level=None)
+        self._lock = threading.Lock()
+        self._records_since_prune = 0
+        self._init_db()
+
+    def _connect(self):
+        return self._db.get()
+
+    def _init_db(self):
+        self._connect().execute(
+            """CREATE TABLE IF NOT EXISTS rollups (
+                granularity TEXT NOT NULL,
+                bucket_start INTEGER NOT NULL,
+                username TEXT NOT NULL,
+                type TEXT NOT NULL,
+                requests INTEGER NOT NULL DEFAULT 0,
+                errors INTEGER NOT NULL DEFAULT 0,
+                cached INTEGER NOT NULL DEFAULT 0,
+                latency_ms_sum REAL NOT NULL DEFAULT 0,
+                latency_ms_max REAL NOT NULL DEFAULT 0,
+                prompt_tokens INTEGER NOT NULL DEFAULT 0,
+                completion_tokens INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (granularity, bucket_start, username, type)
+            ) WITHOUT ROWID"""
+        )
+
+    def record(self, username, entry_type, status="ok", latency_ms=0.0,
+               prompt_tokens=0, completion_tokens=0, at=None):
+        """Add one analysis to its minute, hour and day buckets"""
+        at = at or time.time()
+        errors = 1 if status == "error" else 0
+        cached = 1 if status == "cached" else 0
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for granularity, (width, _) in GRANULARITIES.items():
+                conn.execute(
+                    """INSERT INTO rollups (granularity, bucket_start, username, type, requests, errors,
+                                           cached, latency_ms_sum, latency_ms_max, prompt_tokens, completion_tokens)
+                       VALUES (?, ?, ?, ?, 1, ?, ?, ?, ?, ?, ?)
+                       ON CONFLICT (granularity, bucket_start, username, type) DO UPDATE SET
+                           requests = requests + 1,
+                           errors = errors + excluded.errors,
+                           cached = cached + excluded.cached,
+                           latency_ms_sum = latency_ms_sum + excluded.latency_ms_sum,
+                           latency_ms_max = MAX(latency_ms_max, excluded.latency_ms_max),
+                           prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                           completion_tokens = completion_tokens + excluded.completion_tokens""",
+                    (granularity, int(at // width * width), username, entry_type, errors, cached,
+                     latency_ms, latency_ms, prompt_tokens, completion_tokens)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        with self._lock:
+            self._records_since_prune += 1
+            should_prune = self._records_since_prune >= self.prune_every
+            if should_prune:
+                self._records_since_prune = 0
+        if should_prune:
+            self.prune()
+
+    def prune(self, now=None):
+        """Delete buckets older than their granularity's retention"""
+        now = now or time.time()
+        conn = self._connect()
+        for granularity, (_, retention) in GRANULARITIES.items():
+            if retention is not None:
+                conn.execute(
+                    "DELETE FROM rollups WHERE granularity = ? AND bucket_start < ?",
+                    (granularity, int(now - retention))
+                )
+
+    def series(self, granularity, since, until=None, username=None):
+        """Return per-bucket, per-type rows between since and until (epoch seconds)"""
+        clauses, params = ["granularity = ?", "bucket_start >= ?"], [granularity, int(since)]
+        if until is not None:
+            clauses.append("bucket_start < ?")
+            params.append(int(until))
+        if username is not None:
+            clauses.append("username = ?")
+            params.append(username)
+        rows = self._connect().execute(
+            f"""SELECT bucket_start, type, SUM(requests) AS requests, SUM(errors) AS errors,
+                       SUM(cached) AS cached, SUM(latency_ms_sum) AS latency_ms_sum,
+                       MAX(latency_ms_max) AS latency_ms_max, SUM(prompt_tokens) AS prompt_tokens,
+                       SUM(completion_tokens) AS completion_tokens
+                FROM rollups WHERE {' AND '.join(clauses)}
+                GROUP BY bucket_start, type ORDER BY bucket_start""",
+            params
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def totals(self, granularity, since, until=None, group_by="type"):
+        """Return totals between since and until grouped by "type" or "username"""
+        if group_by not in ("type", "username"):
+            raise ValueError(f"Cannot group rollups by {group_by!r}")
+        clauses, params = ["granularity = ?", "bucket_start >= ?"], [granularity, int(since)]
+        if until is not None:
+            clauses.append("bucket_start < ?")
+            params.append(int(until))
+        rows = self._connect().execute(
+            f"""SELECT {group_by} AS key, SUM(requests) AS requests, SUM(errors) AS errors,
+                       SUM(cached) AS cached, SUM(latency_ms_sum) AS latency_ms_sum,
+                       MAX(latency_ms_max) AS latency_ms_max, SUM(prompt_tokens) AS prompt_tokens,
+                       SUM(completion_tokens) AS completion_tokens
+                FROM rollups WHERE {' AND '.join(clauses)}
+                GROUP BY {group_by} ORDER BY requests DESC""",
+            params
+        ).fetchall()
+        return [dict(row) for row in rows]